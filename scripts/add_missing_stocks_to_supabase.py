@@ -8,7 +8,8 @@ import os
 import sys
 import logging
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, create_engine, func, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.models import Symbol, Universe, get_session, init_db
 from app.config import get_config
@@ -89,6 +90,27 @@ COMPANY_NAMES = {
     "PCAR": "PACCAR Inc."
 }
 
+# Statements built once and executed with a list of parameter sets (executemany)
+SYMBOLS_INSERT = insert(Symbol.__table__).values(
+    symbol=bindparam('symbol'),
+    company_name=bindparam('company_name'),
+    market_cap=bindparam('market_cap'),
+    is_active=bindparam('is_active'),
+    created_at=func.now(),
+    updated_at=func.now()
+)
+
+_universe_insert = pg_insert(Universe.__table__).values(
+    symbol=bindparam('symbol'),
+    active=True,
+    added_at=func.now(),
+    updated_at=func.now()
+)
+UNIVERSE_UPSERT = _universe_insert.on_conflict_do_update(
+    index_elements=['symbol'],
+    set_={'active': True, 'updated_at': func.now()}
+)
+
 
 def add_missing_stocks_to_supabase():
     """Add missing stocks to Supabase universe table."""
@@ -124,48 +146,44 @@ def add_missing_stocks_to_supabase():
             logger.info("✅ All 100 stocks are already in the universe!")
             return
         
-        # Add missing symbols
+        # Look up which missing symbols already exist in symbols table (one query)
+        rows = conn.execute(
+            text('SELECT symbol, id FROM symbols WHERE symbol = ANY(:syms)'),
+            {'syms': missing_symbols}
+        ).fetchall()
+        existing_symbol_ids = {r[0]: r[1] for r in rows}
+        
+        new_symbol_rows = [
+            {
+                'symbol': symbol,
+                'company_name': COMPANY_NAMES.get(symbol, f"{symbol} Corporation"),
+                'market_cap': 100000000000,
+                'is_active': True
+            }
+            for symbol in missing_symbols
+            if symbol not in existing_symbol_ids
+        ]
+        
+        # Add missing symbols (symbols first, then universe) in one transaction
         added_symbols = 0
         added_universe = 0
         
-        for symbol in missing_symbols:
-            try:
-                # Check if symbol exists in symbols table
-                result = conn.execute(text('SELECT id FROM symbols WHERE symbol = :symbol'), {'symbol': symbol})
-                symbol_row = result.fetchone()
-                
-                if not symbol_row:
-                    # Add to symbols table first
-                    company_name = COMPANY_NAMES.get(symbol, f"{symbol} Corporation")
-                    conn.execute(text('''
-                        INSERT INTO symbols (symbol, company_name, market_cap, is_active, created_at, updated_at)
-                        VALUES (:symbol, :company_name, :market_cap, :is_active, NOW(), NOW())
-                    '''), {
-                        'symbol': symbol,
-                        'company_name': company_name,
-                        'market_cap': 100000000000,
-                        'is_active': True
-                    })
-                    conn.commit()
-                    added_symbols += 1
-                    logger.info(f"Added symbol: {symbol}")
-                
-                # Add to universe table
-                conn.execute(text('''
-                    INSERT INTO universe (symbol, added_at, active, updated_at)
-                    VALUES (:symbol, NOW(), :active, NOW())
-                    ON CONFLICT (symbol) DO UPDATE SET active = :active, updated_at = NOW()
-                '''), {
-                    'symbol': symbol,
-                    'active': True
-                })
-                conn.commit()
-                added_universe += 1
-                logger.info(f"Added to universe: {symbol}")
-                
-            except Exception as e:
-                logger.error(f"Error adding {symbol}: {e}")
-                conn.rollback()
+        try:
+            if new_symbol_rows:
+                conn.execute(SYMBOLS_INSERT, new_symbol_rows)
+                added_symbols = len(new_symbol_rows)
+                logger.info(f"Added symbols: {', '.join(r['symbol'] for r in new_symbol_rows)}")
+            
+            conn.execute(UNIVERSE_UPSERT, [{'symbol': s} for s in missing_symbols])
+            added_universe = len(missing_symbols)
+            logger.info(f"Added to universe: {', '.join(missing_symbols)}")
+            
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error adding missing stocks: {e}")
+            conn.rollback()
+            added_symbols = 0
+            added_universe = 0
         
         # Verify final count
         result = conn.execute(text('SELECT COUNT(*) FROM universe WHERE active = true'))
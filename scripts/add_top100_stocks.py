@@ -6,8 +6,9 @@ This script adds stocks to both the symbols and universe tables.
 
 import logging
 from datetime import datetime
-from sqlalchemy.orm import Session
-from app.models import Symbol, Universe, get_session, init_db
+from types import MappingProxyType
+from sqlalchemy import func, select
+from app.models import Symbol, Universe, get_engine, init_db
 from app.config import get_config
 
 logging.basicConfig(level=logging.INFO)
@@ -141,63 +142,69 @@ COMPANY_NAMES = {
     "PCAR": "PACCAR Inc."
 }
 
+# Resolved once at import (read-only) so repeat calls in the same process reuse it
+TOP_100_COMPANY_NAMES = MappingProxyType({
+    symbol: COMPANY_NAMES.get(symbol, f"{symbol} Corporation") for symbol in TOP_100_STOCKS
+})
+
+
+def _upsert(conn, table, rows, set_):
+    """INSERT ... ON CONFLICT (symbol) DO UPDATE for Postgres (Supabase) or SQLite."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.symbol], set_=set_)
+    conn.execute(stmt, rows)
+
 
 def add_top100_stocks():
     """Add top 100 stocks to symbols and universe tables."""
     init_db()
-    session = get_session()
+    engine = get_engine()
+    symbols_tbl = Symbol.__table__
+    universe_tbl = Universe.__table__
+    now = datetime.utcnow()
     
     try:
-        added_symbols = 0
-        added_universe = 0
-        
-        for symbol in TOP_100_STOCKS:
-            # Add or update symbol
-            symbol_obj = session.query(Symbol).filter_by(symbol=symbol).first()
-            if not symbol_obj:
-                symbol_obj = Symbol(
-                    symbol=symbol,
-                    company_name=COMPANY_NAMES.get(symbol, f"{symbol} Corporation"),
-                    market_cap=100000000000,  # Placeholder $100B (will be updated by fundamentals provider)
-                    is_active=True
-                )
-                session.add(symbol_obj)
-                added_symbols += 1
-                logger.info(f"Added symbol: {symbol}")
-            else:
-                symbol_obj.is_active = True
-                logger.debug(f"Symbol already exists: {symbol}")
+        # Single transaction: commits on success, rolls back on error
+        with engine.begin() as conn:
+            # Insert new rows and re-activate existing ones in one upsert per table
+            _upsert(
+                conn,
+                symbols_tbl,
+                [
+                    {
+                        "symbol": symbol,
+                        "company_name": TOP_100_COMPANY_NAMES[symbol],
+                        "market_cap": 100_000_000_000,  # Placeholder $100B (will be updated by fundamentals provider)
+                        "is_active": True,
+                    }
+                    for symbol in TOP_100_STOCKS
+                ],
+                {"is_active": True, "updated_at": now},
+            )
+            _upsert(
+                conn,
+                universe_tbl,
+                [{"symbol": symbol, "active": True, "added_at": now} for symbol in TOP_100_STOCKS],
+                {"active": True, "updated_at": now},
+            )
             
-            # Add to universe if not already there
-            universe_obj = session.query(Universe).filter_by(symbol=symbol).first()
-            if not universe_obj:
-                universe_obj = Universe(
-                    symbol=symbol,
-                    active=True,
-                    added_at=datetime.utcnow()
-                )
-                session.add(universe_obj)
-                added_universe += 1
-                logger.info(f"Added to universe: {symbol}")
-            else:
-                universe_obj.active = True
-                logger.debug(f"Already in universe: {symbol}")
+            # Verify
+            universe_count = conn.execute(
+                select(func.count()).select_from(universe_tbl).where(universe_tbl.c.active.is_(True))
+            ).scalar()
         
-        session.commit()
-        logger.info(f"✅ Successfully added {added_symbols} new symbols and {added_universe} to universe")
+        logger.info(f"✅ Successfully upserted {len(TOP_100_STOCKS)} symbols and universe entries")
         logger.info(f"Total stocks in universe: {len(TOP_100_STOCKS)}")
-        
-        # Verify
-        universe_count = session.query(Universe).filter_by(active=True).count()
         logger.info(f"Verified: {universe_count} active stocks in universe")
         
     except Exception as e:
-        session.rollback()
         logger.error(f"Error adding stocks: {e}", exc_info=True)
         raise
-    finally:
-        session.close()
-
 
 if __name__ == "__main__":
     logger.info("Adding top 100 stocks to universe...")
@@ -0,0 +1,361 @@
+"""
+Shared Alpaca fetch and driver for the fetch_last20_*_2years.py scripts:
+parallel multi-symbol 30-minute bar requests (cached per symbol on disk),
+the market-hours filter, per-stock statistics and CSV output.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import requests
+import pandas as pd
+import pyarrow.dataset as ds
+from datetime import datetime, timedelta
+from config import Config
+from bar_pipeline import (
+    day_numbers, format_day, market_hours_mask, save_csv, time_date_arrays, to_et, wall_clock_ns
+)
+from concurrent.futures import ThreadPoolExecutor
+from alpaca.data.enums import DataFeed
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+
+# Alpaca pages through a multi-symbol request sequentially, so the symbols are
+# split into a few requests that run in parallel (kept small for the rate limit)
+SYMBOLS_PER_REQUEST = 5
+MAX_FETCH_WORKERS = 4
+
+# Retries for rate limits (429), server errors (5xx) and dropped connections
+FETCH_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5  # seconds, doubled after each failed attempt
+RETRY_MAX_DELAY = 8
+
+BAR_TIMEFRAME = TimeFrame(30, TimeFrameUnit.Minute)
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'trade_count', 'vwap')
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limit, server error or connection problem (data errors fail fast)."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    try:
+        status = error.status_code  # alpaca.common.exceptions.APIError
+    except Exception:
+        return False
+    return status == 429 or (status is not None and status >= 500)
+
+
+def _get_stock_bars(data_client, request_params):
+    """get_stock_bars() with exponential backoff on retryable errors."""
+    for attempt in range(FETCH_ATTEMPTS):
+        try:
+            return data_client.get_stock_bars(request_params)
+        except Exception as e:
+            if attempt == FETCH_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            time.sleep(min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY))
+
+
+def feed_kwargs() -> dict:
+    """StockBarsRequest feed argument for Config.ALPACA_DATA_FEED (empty: account default)."""
+    if not Config.ALPACA_DATA_FEED:
+        return {}
+    return {'feed': DataFeed(Config.ALPACA_DATA_FEED.lower())}
+
+
+def fetch_stock_batch(symbols, data_client, start_date, end_date) -> dict:
+    """One StockBarsRequest for a batch of symbols; returns symbol -> 30-minute bars frame."""
+    request_params = StockBarsRequest(
+        symbol_or_symbols=list(symbols),
+        timeframe=BAR_TIMEFRAME,
+        start=start_date.date(),
+        end=end_date.date(),
+        **feed_kwargs()
+    )
+    
+    bars = _get_stock_bars(data_client, request_params)
+    
+    if not bars or not hasattr(bars, 'data') or bars.df.empty:
+        return {}
+    
+    return {
+        symbol: group.droplevel('symbol')
+        for symbol, group in bars.df.groupby(level='symbol', sort=False)
+    }
+
+
+def _cache_path(symbol: str, start_date, end_date) -> str:
+    """Cache file for one symbol's 30-minute bars over [start_date, end_date)."""
+    key = f"{symbol}|{start_date.date()}|{end_date.date()}|30Min"
+    if Config.ALPACA_DATA_FEED:
+        # Bars differ by feed, so each feed gets its own cache entry
+        key += f"|{Config.ALPACA_DATA_FEED.lower()}"
+    key = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(Config.ALPACA_CACHE_DIR, f"{key}.parquet")
+
+
+def fetch_stocks_alpaca(symbols, data_client, start_date, end_date) -> dict:
+    """
+    Fetch 30-minute bars for all symbols, SYMBOLS_PER_REQUEST symbols per request,
+    with up to MAX_FETCH_WORKERS requests in flight. Symbols already fetched for
+    the same date range are read from Config.ALPACA_CACHE_DIR instead.
+    
+    Returns:
+        Dict of symbol -> 30-minute bars frame (symbols without data are left out)
+    """
+    bars_by_symbol = {}
+    for symbol in symbols:
+        path = _cache_path(symbol, start_date, end_date)
+        if os.path.exists(path):
+            bars_by_symbol[symbol] = pd.read_parquet(path)
+    if bars_by_symbol:
+        print(f"   💾 {len(bars_by_symbol)} symbols from cache")
+    
+    to_fetch = [symbol for symbol in symbols if symbol not in bars_by_symbol]
+    if not to_fetch:
+        return bars_by_symbol
+    
+    batches = [to_fetch[i:i + SYMBOLS_PER_REQUEST] for i in range(0, len(to_fetch), SYMBOLS_PER_REQUEST)]
+    print(f"   📡 Fetching {len(to_fetch)} symbols in {len(batches)} parallel requests...", end=' ', flush=True)
+    
+    os.makedirs(Config.ALPACA_CACHE_DIR, exist_ok=True)
+    fetched = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = [
+            executor.submit(fetch_stock_batch, batch, data_client, start_date, end_date)
+            for batch in batches
+        ]
+        for future in futures:
+            try:
+                batch_bars = future.result()
+            except Exception as e:
+                errors.append(str(e)[:50])
+                continue
+            for symbol, bars in batch_bars.items():
+                bars.to_parquet(_cache_path(symbol, start_date, end_date))
+            bars_by_symbol.update(batch_bars)
+            fetched += len(batch_bars)
+    
+    print(f"✅ {fetched} symbols")
+    for error in errors:
+        print(f"   ❌ Error: {error}")
+    return bars_by_symbol
+
+
+def process_stock_bars(symbol: str, df: pd.DataFrame):
+    """Market-hours bars in ET for one symbol's 30-minute bars."""
+    try:
+        # Bars come indexed by timestamp; take it straight into the Datetime column
+        # (Alpaca aggregates the 30-minute bars server-side; keep only the bar columns)
+        df = df.rename_axis('Datetime').reset_index()
+        df = df[['Datetime'] + [col for col in BAR_COLUMNS if col in df.columns]]
+        
+        df['Datetime'] = to_et(df['Datetime'])
+        
+        # Market hours (9:30 AM - 4:00 PM ET) on the integer ET minute of day
+        filtered_data = df[market_hours_mask(wall_clock_ns(df['Datetime']))]
+        
+        if filtered_data.empty:
+            print(f"❌ No market hours data")
+            return None
+        
+        filtered_data = filtered_data.sort_values('Datetime')
+        
+        filtered_data = filtered_data.rename(columns={
+            'open': 'Open',
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume'
+        })
+        
+        # float32 prices and int64 volume halve the bytes concatenated, sorted and written
+        filtered_data = filtered_data.astype({
+            'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32', 'Volume': 'int64'
+        })
+        filtered_data['Symbol'] = symbol
+        
+        print(f"✅ {len(filtered_data)} data points")
+        return filtered_data
+        
+    except Exception as e:
+        print(f"❌ Error: {str(e)[:50]}")
+        return None
+
+
+def _write_part(parts_dir: str, symbol: str, data: pd.DataFrame):
+    """Write one symbol's bars to parts_dir/Symbol=<symbol>/part.parquet."""
+    symbol_dir = os.path.join(parts_dir, f"Symbol={symbol}")
+    os.makedirs(symbol_dir, exist_ok=True)
+    data.drop(columns='Symbol').to_parquet(os.path.join(symbol_dir, 'part.parquet'), index=False)
+
+
+def _read_parts(parts_dir: str, symbols) -> pd.DataFrame:
+    """
+    Read the per-symbol files back as one Arrow dataset (Symbol from the hive path).
+    
+    Each file is one symbol already in time order, so listing them in symbol order
+    gives the Symbol/Datetime order without a sort.
+    """
+    paths = [os.path.join(parts_dir, f"Symbol={symbol}", 'part.parquet') for symbol in sorted(symbols)]
+    dataset = ds.dataset(paths, format='parquet', partitioning='hive', partition_base_dir=parts_dir)
+    return dataset.to_table().to_pandas()
+
+
+def run_fetch(symbols, title: str, output_prefix: str, note: str = None, days: int = 730,
+              write_csv: bool = True):
+    """
+    Fetch and combine 30-minute market-hours bars for symbols, print per-stock
+    statistics and save <output_prefix>_<YYYYMMDD>.parquet (and .csv).
+    
+    Args:
+        symbols: Tickers to fetch
+        title: Banner line printed at the start
+        output_prefix: Output CSV name before the date suffix
+        note: Optional line printed under the stock list
+        days: Lookback in days
+        write_csv: Also write the CSV next to the Parquet file
+    
+    Returns:
+        Combined DataFrame, or None on failure
+    """
+    if not Config.ALPACA_API_KEY or not Config.ALPACA_SECRET_KEY:
+        print("❌ Alpaca API credentials not configured!")
+        return None
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
+    print("=" * 80)
+    print(title)
+    print("Using: Alpaca API")
+    print("=" * 80)
+    print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    print(f"Interval: 30 minutes")
+    print(f"Market Hours: 9:30 AM - 4:00 PM ET")
+    print(f"Stocks: {len(symbols)} stocks")
+    print(f"Stocks: {', '.join(symbols)}")
+    print()
+    if note:
+        print(note)
+        print()
+    
+    # Each symbol's bars are written out as soon as they are processed, so only
+    # one symbol is held in memory until the combined read
+    parts_dir = tempfile.mkdtemp(prefix=f"{output_prefix}_parts_")
+    try:
+        data_client = StockHistoricalDataClient(
+            api_key=Config.ALPACA_API_KEY,
+            secret_key=Config.ALPACA_SECRET_KEY
+        )
+        
+        print("📡 Fetching data from Alpaca API...")
+        bars_by_symbol = fetch_stocks_alpaca(symbols, data_client, start_date, end_date)
+        print()
+        
+        successful = []
+        failed = []
+        
+        for i, symbol in enumerate(symbols, 1):
+            print(f"[{i}/{len(symbols)}] {symbol}:", end=' ')
+            
+            if symbol in bars_by_symbol:
+                data = process_stock_bars(symbol, bars_by_symbol.pop(symbol))
+            else:
+                print(f"❌ No data")
+                data = None
+            
+            if data is not None:
+                _write_part(parts_dir, symbol, data)
+                successful.append(symbol)
+            else:
+                failed.append(symbol)
+        
+        if not successful:
+            print("\n❌ No data fetched for any stocks")
+            return None
+        
+        print()
+        print("=" * 80)
+        print("COMBINING DATA")
+        print("=" * 80)
+        
+        combined_df = _read_parts(parts_dir, successful)
+        # Categorical symbols, categories in sorted order
+        combined_df['Symbol'] = combined_df['Symbol'].astype(pd.CategoricalDtype(sorted(successful)))
+        
+        print(f"✅ Combined {len(combined_df)} total data points")
+        
+        print()
+        print("=" * 80)
+        print("FETCH SUMMARY")
+        print("=" * 80)
+        print(f"✅ Successful: {len(successful)} stocks")
+        print(f"❌ Failed: {len(failed)} stocks")
+        
+        if successful:
+            print(f"\n✅ Successfully fetched: {', '.join(successful)}")
+        
+        if failed:
+            print(f"\n❌ Failed: {', '.join(failed)}")
+        
+        print()
+        print("=" * 80)
+        print("DATA STATISTICS BY STOCK")
+        print("=" * 80)
+        
+        # One grouped pass over the data, rows in fetch order; days as ET day numbers
+        day_int = day_numbers(wall_clock_ns(combined_df['Datetime']), combined_df.index)
+        agg = combined_df.assign(Day=day_int).groupby('Symbol', observed=True).agg(
+            data_points=('Datetime', 'size'),
+            date_min=('Day', 'min'),
+            date_max=('Day', 'max'),
+            trading_days=('Day', 'nunique'),
+            avg_price=('Close', 'mean'),
+            high=('High', 'max'),
+            low=('Low', 'min'),
+            total_volume=('Volume', 'sum')
+        ).reindex(successful)
+        
+        # Display columns formatted column-wise straight from the aggregates
+        stats_df = pd.DataFrame({
+            'Symbol': agg.index,
+            'Data Points': agg['data_points'],
+            'Date Range': agg['date_min'].map(format_day) + ' to ' + agg['date_max'].map(format_day),
+            'Trading Days': agg['trading_days'],
+            'Avg Price': agg['avg_price'].map('${:.2f}'.format),
+            'High': agg['high'].map('${:.2f}'.format),
+            'Low': agg['low'].map('${:.2f}'.format),
+            'Total Volume': agg['total_volume'].astype('int64').map('{:,}'.format)
+        })
+        print(stats_df.to_string(index=False))
+        
+        output_file = f"{output_prefix}_{end_date.strftime('%Y%m%d')}.csv"
+        # Typed, compressed copy for downstream readers (no CSV re-parsing)
+        parquet_file = output_file.replace('.csv', '.parquet')
+        combined_df.to_parquet(parquet_file, index=False)
+        print()
+        if write_csv:
+            # combine_all_100_stocks_2years.py reads the CSV files, including the
+            # Date/Time columns, which are cast from Datetime only for the write
+            csv_columns = [col for col in combined_df.columns if col != 'Symbol'] + ['Date', 'Time', 'Symbol']
+            save_csv(
+                combined_df, output_file, text_columns=('Datetime', 'Symbol'),
+                extra_columns=time_date_arrays(combined_df['Datetime']), columns=csv_columns
+            )
+            print(f"✅ Combined data saved to: {output_file}")
+        print(f"✅ Parquet saved to: {parquet_file}")
+        print(f"   Total rows: {len(combined_df):,}")
+        
+        return combined_df
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
@@ -9,9 +9,122 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import logging
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; the kernels then run as plain Python
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+RSI_PERIOD = 14
+
+
+@njit(cache=True)
+def _score_bars(open_, close, volume, lookback):
+    """
+    Compute the per-bar anomaly statistics for a whole series in one pass.
+    
+    Mirrors detect_price/volume/gap/rsi_anomaly (sample std, pct_change,
+    14-bar simple-average RSI). Entries before a statistic's warm-up are NaN.
+    
+    Returns:
+        Tuple of arrays: z_score, price_change_pct, historical_volatility,
+        volume_ratio, gap_pct, rsi
+    """
+    n = close.shape[0]
+    z_score = np.full(n, np.nan)
+    change_pct = np.full(n, np.nan)
+    hist_vol = np.full(n, np.nan)
+    volume_ratio = np.full(n, np.nan)
+    gap_pct = np.full(n, np.nan)
+    rsi = np.full(n, np.nan)
+    
+    for i in range(1, n):
+        prev_close = close[i - 1]
+        change_pct[i] = (close[i] - prev_close) / prev_close * 100
+        gap_pct[i] = (open_[i] - prev_close) / prev_close * 100
+        
+        if i >= RSI_PERIOD:
+            gain = 0.0
+            loss = 0.0
+            for j in range(i - RSI_PERIOD + 1, i + 1):
+                delta = close[j] - close[j - 1]
+                if delta > 0:
+                    gain += delta
+                elif delta < 0:
+                    loss -= delta
+            gain /= RSI_PERIOD
+            loss /= RSI_PERIOD
+            if loss > 0:
+                rsi[i] = 100 - 100 / (1 + gain / loss)
+            elif gain > 0:
+                rsi[i] = 100.0
+        
+        if i < lookback:
+            continue
+        
+        start = i - lookback
+        mean_price = 0.0
+        mean_volume = 0.0
+        for j in range(start, i):
+            mean_price += close[j]
+            mean_volume += volume[j]
+        mean_price /= lookback
+        mean_volume /= lookback
+        
+        var_price = 0.0
+        for j in range(start, i):
+            var_price += (close[j] - mean_price) ** 2
+        std_price = np.sqrt(var_price / (lookback - 1)) if lookback > 1 else np.nan
+        z_score[i] = (close[i] - mean_price) / std_price if std_price > 0 else 0.0
+        
+        # Volatility of the bar-to-bar returns inside the window
+        num_returns = lookback - 1
+        if num_returns > 1:
+            mean_ret = 0.0
+            for j in range(start + 1, i):
+                mean_ret += close[j] / close[j - 1] - 1
+            mean_ret /= num_returns
+            var_ret = 0.0
+            for j in range(start + 1, i):
+                var_ret += (close[j] / close[j - 1] - 1 - mean_ret) ** 2
+            hist_vol[i] = np.sqrt(var_ret / (num_returns - 1)) * 100
+        
+        volume_ratio[i] = volume[i] / mean_volume if mean_volume > 0 else 1.0
+    
+    return z_score, change_pct, hist_vol, volume_ratio, gap_pct, rsi
+
+
+@njit(parallel=True, cache=True)
+def _score_all(open_, close, volume, lengths, lookback):
+    """
+    Run _score_bars for every symbol in parallel.
+    
+    Inputs are (num_symbols, max_bars) arrays padded past each row's length.
+    Returns a (6, num_symbols, max_bars) array in _score_bars output order.
+    """
+    num_symbols, max_bars = close.shape
+    out = np.full((6, num_symbols, max_bars), np.nan)
+    for s in prange(num_symbols):
+        n = lengths[s]
+        scores = _score_bars(open_[s, :n], close[s, :n], volume[s, :n], lookback)
+        for k in range(6):
+            out[k, s, :n] = scores[k]
+    return out
+
+
+def warm_up_kernels():
+    """Compile the Numba kernels once (no-op cost when Numba is unavailable)."""
+    dummy = np.ones(2)
+    _score_bars(dummy, dummy, dummy, 1)
+    _score_all(np.ones((1, 2)), np.ones((1, 2)), np.ones((1, 2)), np.array([2], dtype=np.int64), 1)
+
 
 class AnomalyDetector:
     """Detects anomalies in stock price and volume data."""
@@ -170,12 +283,135 @@ class AnomalyDetector:
         rsi = 100 - (100 / (1 + rs))
         return rsi
     
-    def detect_all_anomalies(self, data: pd.DataFrame, current_idx: int) -> Dict:
-        """Detect all types of anomalies."""
-        price_anomaly = self.detect_price_anomaly(data, current_idx)
-        volume_anomaly = self.detect_volume_anomaly(data, current_idx)
-        gap_anomaly = self.detect_gap_anomaly(data, current_idx)
-        rsi_anomaly = self.detect_rsi_anomaly(data, current_idx)
+    def score_bars(self, data: pd.DataFrame) -> Tuple[np.ndarray, ...]:
+        """
+        Precompute anomaly statistics for every bar of a series.
+        
+        Pass the result to detect_all_anomalies(scores=...) to avoid
+        re-slicing the DataFrame on every bar.
+        """
+        return _score_bars(
+            data['Open'].to_numpy(dtype=np.float64),
+            data['Close'].to_numpy(dtype=np.float64),
+            data['Volume'].to_numpy(dtype=np.float64),
+            self.lookback_period
+        )
+    
+    def score_symbols(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Tuple[np.ndarray, ...]]:
+        """
+        Precompute anomaly statistics for several symbols at once.
+        
+        The series are stacked into padded 2-D arrays and scored in one
+        parallel kernel call (one thread per symbol when Numba is available).
+        
+        Returns:
+            Dict of symbol -> score_bars()-style tuple of arrays
+        """
+        symbols = [symbol for symbol, data in frames.items() if not data.empty]
+        if not symbols:
+            return {}
+        
+        lengths = np.array([len(frames[symbol]) for symbol in symbols], dtype=np.int64)
+        shape = (len(symbols), int(lengths.max()))
+        open_ = np.zeros(shape)
+        close = np.ones(shape)
+        volume = np.zeros(shape)
+        for row, symbol in enumerate(symbols):
+            data = frames[symbol]
+            n = lengths[row]
+            open_[row, :n] = data['Open'].to_numpy(dtype=np.float64)
+            close[row, :n] = data['Close'].to_numpy(dtype=np.float64)
+            volume[row, :n] = data['Volume'].to_numpy(dtype=np.float64)
+        
+        out = _score_all(open_, close, volume, lengths, self.lookback_period)
+        return {
+            symbol: tuple(out[k, row, :lengths[row]] for k in range(6))
+            for row, symbol in enumerate(symbols)
+        }
+    
+    def _anomalies_from_scores(self, scores: Tuple[np.ndarray, ...], current_idx: int) -> Tuple[Dict, Dict, Dict, Dict]:
+        """Build the per-detector result dicts for one bar from score_bars() output."""
+        z_score, change_pct, hist_vol, volume_ratio, gap_pct, rsi = scores
+        
+        if current_idx < self.lookback_period:
+            price_anomaly = {'is_anomaly': False}
+            volume_anomaly = {'is_anomaly': False}
+        else:
+            z = float(z_score[current_idx])
+            price_change_pct = float(change_pct[current_idx])
+            anomalies = []
+            severity = 0
+            if z < -2.0:
+                anomalies.append('oversold')
+                severity += abs(z)
+            if z > 2.0:
+                anomalies.append('overbought')
+                severity += abs(z)
+            if price_change_pct < -3.0:
+                anomalies.append('extreme_drop')
+                severity += abs(price_change_pct) / 3
+            if price_change_pct > 3.0:
+                anomalies.append('extreme_rise')
+                severity += abs(price_change_pct) / 3
+            if abs(price_change_pct) > hist_vol[current_idx] * 2:
+                anomalies.append('volatility_spike')
+                severity += 1
+            price_anomaly = {
+                'is_anomaly': len(anomalies) > 0,
+                'anomaly_types': anomalies,
+                'severity': severity,
+                'z_score': z,
+                'price_change_pct': price_change_pct
+            }
+            
+            ratio = float(volume_ratio[current_idx])
+            volume_anomaly = {
+                'is_anomaly': ratio > 2.0,
+                'volume_ratio': ratio,
+                'volume_spike': ratio > 2.0
+            }
+        
+        if current_idx < 1:
+            gap_anomaly = {'is_anomaly': False}
+        else:
+            gap = float(gap_pct[current_idx])
+            gap_anomaly = {
+                'is_anomaly': gap < -2.0 or gap > 2.0,
+                'gap_pct': gap,
+                'gap_down': gap < -2.0,
+                'gap_up': gap > 2.0
+            }
+        
+        current_rsi = float(rsi[current_idx])
+        if current_idx < RSI_PERIOD or np.isnan(current_rsi):
+            rsi_anomaly = {'is_anomaly': False}
+        else:
+            rsi_anomaly = {
+                'is_anomaly': current_rsi < 30 or current_rsi > 70,
+                'rsi': current_rsi,
+                'oversold': current_rsi < 30,
+                'overbought': current_rsi > 70
+            }
+        
+        return price_anomaly, volume_anomaly, gap_anomaly, rsi_anomaly
+    
+    def detect_all_anomalies(self, data: pd.DataFrame, current_idx: int,
+                             scores: Optional[Tuple[np.ndarray, ...]] = None) -> Dict:
+        """
+        Detect all types of anomalies.
+        
+        Args:
+            data: OHLCV DataFrame
+            current_idx: Bar to evaluate
+            scores: Optional output of score_bars(data) to use instead of per-bar slicing
+        """
+        if scores is not None:
+            price_anomaly, volume_anomaly, gap_anomaly, rsi_anomaly = self._anomalies_from_scores(scores, current_idx)
+        else:
+            price_anomaly = self.detect_price_anomaly(data, current_idx)
+            volume_anomaly = self.detect_volume_anomaly(data, current_idx)
+            gap_anomaly = self.detect_gap_anomaly(data, current_idx)
+            rsi_anomaly = self.detect_rsi_anomaly(data, current_idx)
         
         # Combine anomalies
         all_anomalies = []
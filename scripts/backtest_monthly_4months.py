@@ -2,36 +2,53 @@
 Backtest Current Improved Anomaly Strategy - Monthly Breakdown (4 Months)
 Runs separate backtests for each of the last 4 months
 """
+import io
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from improved_anomaly_strategy import ImprovedAnomalyTradingStrategy
+from anomaly_strategy import warm_up_kernels
 from config import Config
+from contextlib import redirect_stdout
 
 
-def run_monthly_backtest(stocks, position_size, month_num: int, end_date: datetime):
-    """Run backtest for a specific month using fixed date ranges."""
-    # Use fixed date ranges based on the successful 3-month backtest period
-    # Going back 4 months from mid-August 2024 to mid-November 2024
-    # Month 1: Oct 15 - Nov 13 (most recent)
-    # Month 2: Sep 15 - Oct 14
-    # Month 3: Aug 15 - Sep 14
-    # Month 4: Jul 15 - Aug 14
-    
-    month_ranges = [
-        {'start': '2024-10-01', 'end': '2024-10-31', 'name': 'October 2024'},
-        {'start': '2024-09-01', 'end': '2024-09-30', 'name': 'September 2024'},
-        {'start': '2024-08-01', 'end': '2024-08-31', 'name': 'August 2024'},
-        {'start': '2024-07-01', 'end': '2024-07-31', 'name': 'July 2024'},
-    ]
+# Use fixed date ranges based on the successful 3-month backtest period
+# Going back 4 months from mid-August 2024 to mid-November 2024
+# Month 1: Oct 15 - Nov 13 (most recent)
+# Month 2: Sep 15 - Oct 14
+# Month 3: Aug 15 - Sep 14
+# Month 4: Jul 15 - Aug 14
+MONTH_RANGES = [
+    {'start': '2024-10-01', 'end': '2024-10-31', 'name': 'October 2024'},
+    {'start': '2024-09-01', 'end': '2024-09-30', 'name': 'September 2024'},
+    {'start': '2024-08-01', 'end': '2024-08-31', 'name': 'August 2024'},
+    {'start': '2024-07-01', 'end': '2024-07-31', 'name': 'July 2024'},
+]
+
+# Fetch data starting 30 days before the month to ensure we have enough
+# historical data for the 20-day lookback period
+LOOKBACK_DAYS = 30
+
+
+def fetch_all_price_data(stocks) -> dict:
+    """Fetch daily bars once for the window covering all 4 months (plus lookback)."""
+    fetch_start = min(datetime.strptime(m['start'], '%Y-%m-%d') for m in MONTH_RANGES) - timedelta(days=LOOKBACK_DAYS)
+    fetch_end = max(m['end'] for m in MONTH_RANGES)
     
-    month_info = month_ranges[month_num - 1]
+    fetcher = ImprovedAnomalyTradingStrategy(stocks=stocks)
+    fetcher.start_date = fetch_start.strftime('%Y-%m-%d')
+    fetcher.end_date = fetch_end
+    return {symbol.strip().upper(): fetcher.fetch_stock_data(symbol.strip().upper()) for symbol in stocks}
+
+
+def run_monthly_backtest(stocks, position_size, month_num: int, end_date: datetime, price_data: dict = None):
+    """Run backtest for a specific month using fixed date ranges."""
+    month_info = MONTH_RANGES[month_num - 1]
     month_start = datetime.strptime(month_info['start'], '%Y-%m-%d')
     month_end_date = datetime.strptime(month_info['end'], '%Y-%m-%d')
     month_name = month_info['name']
     
-    # Fetch data starting 30 days before the month to ensure we have enough
-    # historical data for the 20-day lookback period
-    data_start_date = month_start - timedelta(days=30)
+    data_start_date = month_start - timedelta(days=LOOKBACK_DAYS)
     
     print(f'\n{"="*100}')
     print(f'{month_name.upper()} BACKTEST')
@@ -52,6 +69,9 @@ def run_monthly_backtest(stocks, position_size, month_num: int, end_date: dateti
     # Set data fetch dates (includes lookback period)
     strategy.start_date = data_start_date.strftime('%Y-%m-%d')
     strategy.end_date = month_end_date.strftime('%Y-%m-%d')
+    # Slice this month's window from the shared fetch instead of re-downloading
+    if price_data is not None:
+        strategy.price_data = price_data
     
     # Store the actual backtest period for filtering trades
     strategy.backtest_start_date = month_start
@@ -89,6 +109,20 @@ def run_monthly_backtest(stocks, position_size, month_num: int, end_date: dateti
     }
 
 
+def run_monthly_backtest_captured(*args):
+    """
+    run_monthly_backtest() in a worker process with its progress output captured,
+    so the parent prints each month's output as one block instead of interleaved.
+    
+    Returns:
+        (result, output) tuple
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = run_monthly_backtest(*args)
+    return result, output.getvalue()
+
+
 def main():
     """Run monthly backtests for the last 4 months."""
     # Use the full 30-stock list from default configuration
@@ -114,11 +148,26 @@ def main():
     end_date = datetime.now()
     all_results = []
     
-    # Run backtest for each of the last 4 months
-    for month_num in range(1, 5):
-        result = run_monthly_backtest(stocks, position_size, month_num, end_date)
-        all_results.append(result)
-        
+    # Compile the anomaly kernel once (writes the on-disk cache the workers load)
+    warm_up_kernels()
+    
+    # The monthly windows overlap, so download every stock once and slice per month
+    print(f'Fetching daily data for {len(stocks)} stocks (all 4 months)...')
+    price_data = fetch_all_price_data(stocks)
+    
+    # The 4 months share no state, so run them in parallel worker processes
+    with ProcessPoolExecutor(max_workers=4, initializer=warm_up_kernels) as executor:
+        futures = {
+            executor.submit(run_monthly_backtest_captured, stocks, position_size, month_num, end_date, price_data): month_num
+            for month_num in range(1, 5)
+        }
+        for future in as_completed(futures):
+            result, output = future.result()
+            print(output, end='')
+            all_results.append(result)
+    all_results.sort(key=lambda r: r['month_num'])
+    
+    for result in all_results:
         # Display monthly results
         print(f'\n📊 {result["month"]} Results:')
         print(f'  Period: {result["start_date"]} to {result["end_date"]} ({result["days"]} days)')
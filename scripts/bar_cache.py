@@ -0,0 +1,188 @@
+"""
+Local SQLite cache for Yahoo Finance intraday bars.
+Repeated runs read bars from disk and only download the part of the
+requested window that has not been fetched before. Windows that come back
+empty (yfinance returns an empty frame on rate limits and errors) are not
+marked as fetched, so they are retried on the next run.
+"""
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import Config
+
+EXCHANGE_TZ = 'America/New_York'
+
+# Yahoo serves at most ~60 days of intraday bars per request, so longer missing
+# ranges are split into windows and downloaded concurrently
+FETCH_WINDOW_SECONDS = 59 * 86400
+MAX_FETCH_WORKERS = 4
+FETCH_SUBMIT_DELAY = 0.25  # seconds between window requests (Yahoo rate limits)
+
+# How far back Yahoo serves each intraday interval; older windows are never requested
+INTRADAY_MAX_AGE_SECONDS = {
+    '1m': 30 * 86400,
+    '2m': 60 * 86400, '5m': 60 * 86400, '15m': 60 * 86400, '30m': 60 * 86400, '90m': 60 * 86400,
+    '60m': 730 * 86400, '1h': 730 * 86400,
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+    PRIMARY KEY (symbol, interval, ts)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+UPSERT_BARS_SQL = "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def _to_epoch(value) -> int:
+    """Epoch seconds for a date/datetime; naive values are taken as exchange time."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(EXCHANGE_TZ)
+    return int(ts.timestamp())
+
+
+def _from_epoch(seconds: int) -> pd.Timestamp:
+    return pd.Timestamp(seconds, unit='s', tz='UTC').tz_convert(EXCHANGE_TZ)
+
+
+def _store(conn, symbol: str, interval: str, data: pd.DataFrame):
+    """Upsert the OHLCV columns of a ticker.history() frame."""
+    if data.empty:
+        return
+    index = data.index
+    if index.tz is None:
+        index = index.tz_localize(EXCHANGE_TZ)
+    seconds = index.tz_convert('UTC').tz_localize(None).to_numpy().astype('datetime64[s]').astype('int64')
+    rows = zip(
+        [symbol] * len(data), [interval] * len(data), seconds.tolist(),
+        data['Open'].tolist(), data['High'].tolist(), data['Low'].tolist(), data['Close'].tolist(),
+        data['Volume'].fillna(0).astype('int64').tolist()
+    )
+    conn.executemany(UPSERT_BARS_SQL, rows)
+
+
+def _fetch_windows(ticker, interval: str, ranges):
+    """
+    Download the missing ranges in <= FETCH_WINDOW_SECONDS windows, in parallel.
+
+    Returns:
+        List of (window start, window end, bars) per window
+    """
+    windows = [
+        (lo, min(lo + FETCH_WINDOW_SECONDS, range_end))
+        for range_start, range_end in ranges
+        for lo in range(range_start, range_end, FETCH_WINDOW_SECONDS)
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = []
+        for i, (lo, hi) in enumerate(windows):
+            if i:
+                time.sleep(FETCH_SUBMIT_DELAY)
+            futures.append(executor.submit(
+                ticker.history, start=_from_epoch(lo), end=_from_epoch(hi), interval=interval
+            ))
+        return [(lo, hi, future.result()) for (lo, hi), future in zip(windows, futures)]
+
+
+def _merge_coverage(covered, fetched):
+    """
+    The fetched range to record: the covered range extended by the windows that
+    returned bars and touch it. Without earlier coverage, the most recent run of
+    touching windows is used.
+    """
+    spans = sorted(fetched + ([covered] if covered else []))
+    merged = []
+    for lo, hi in spans:
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    if covered:
+        return next(tuple(span) for span in merged if span[0] <= covered[0] and covered[1] <= span[1])
+    return tuple(merged[-1]) if merged else None
+
+
+def cached_history(ticker, symbol: str, interval: str, start, end, db_path: str = None) -> pd.DataFrame:
+    """
+    ticker.history(start=..., end=..., interval=...) backed by the local cache.
+
+    Only the parts of [start, end) outside the range already fetched for this
+    symbol/interval are downloaded; the most recent cached bar is re-fetched so a
+    bar that was still forming on the last run gets its final values. Intraday
+    requests are clipped to the history Yahoo serves (INTRADAY_MAX_AGE_SECONDS);
+    older bars come only from the cache.
+
+    Returns:
+        DataFrame indexed by Datetime (ET) with Open, High, Low, Close, Volume
+    """
+    start_ts, end_ts = _to_epoch(start), _to_epoch(end)
+    conn = sqlite3.connect(db_path or Config.BAR_CACHE_PATH)
+    try:
+        conn.executescript(SCHEMA_SQL)
+        covered = conn.execute(
+            "SELECT start_ts, end_ts FROM coverage WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        ).fetchone()
+
+        if covered is None:
+            missing = [(start_ts, end_ts)]
+        else:
+            missing = []
+            if start_ts < covered[0]:
+                missing.append((start_ts, covered[0]))
+            if end_ts > covered[1]:
+                last_bar = conn.execute(
+                    "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?",
+                    (symbol, interval)
+                ).fetchone()[0]
+                tail_start = covered[1] if last_bar is None else min(covered[1], last_bar)
+                missing.append((tail_start, end_ts))
+
+        max_age = INTRADAY_MAX_AGE_SECONDS.get(interval)
+        if max_age is not None:
+            earliest = int(time.time()) - max_age
+            missing = [(max(lo, earliest), hi) for lo, hi in missing if hi > earliest]
+
+        fetched = []
+        for lo, hi, data in _fetch_windows(ticker, interval, missing):
+            if not data.empty:
+                _store(conn, symbol, interval, data)
+                fetched.append((lo, hi))
+
+        new_coverage = _merge_coverage(covered, fetched)
+        if new_coverage is not None and new_coverage != covered:
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+                (symbol, interval) + new_coverage
+            )
+        conn.commit()
+
+        bars = pd.read_sql_query(
+            "SELECT ts, open, high, low, close, volume FROM bars "
+            "WHERE symbol = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            conn,
+            params=(symbol, interval, start_ts, end_ts),
+            parse_dates={'ts': {'unit': 's', 'utc': True}}
+        )
+    finally:
+        conn.close()
+
+    bars['ts'] = bars['ts'].dt.tz_convert(EXCHANGE_TZ)
+    bars = bars.set_index('ts').rename(columns={
+        'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'
+    })
+    bars.index.name = 'Datetime'
+    return bars
@@ -0,0 +1,215 @@
+"""
+Shared steps for the AAPL 30-minute bar scripts (fetch_aapl_30min*.py,
+fetch_aapl_alpaca_1year.py): ET wall-clock conversion, market-hours filter,
+per-day grouping, table formatting and CSV output. alpaca_fetch.py uses the
+market-hours filter as well.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pytz
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# pytz rather than zoneinfo: pandas field access (.dt.hour/.day/...) on ZoneInfo-aware
+# datetimes is roughly 10x slower
+ET_TZ = pytz.timezone('America/New_York')
+
+# Regular session as ET minute-of-day (9:30 AM - 4:00 PM, inclusive)
+MARKET_OPEN_MIN = 9 * 60 + 30
+MARKET_CLOSE_MIN = 16 * 60
+
+# Text columns of the combined/per-batch CSV files, read as strings so the timestamp
+# and date text is kept as-is (Arrow would otherwise parse Datetime to UTC)
+CSV_TEXT_COLUMNS = {'Datetime': pa.string(), 'Date': pa.string(), 'Time': pa.string(), 'Symbol': pa.string()}
+
+# Full read schema for those files. The numeric columns are pinned to float64:
+# to_csv writes 71226.0 and write_csv_table writes 71226, which Arrow would
+# otherwise infer as double and int64 and refuse to concatenate
+CSV_COLUMN_TYPES = {
+    **CSV_TEXT_COLUMNS,
+    **{col: pa.float64() for col in ('Open', 'High', 'Low', 'Close', 'Volume', 'trade_count', 'vwap')}
+}
+
+# Columns yfinance adds to history() that these scripts never use
+YF_EXTRA_COLUMNS = ('Dividends', 'Stock Splits', 'Capital Gains')
+
+NS_PER_MINUTE = 60_000_000_000
+NS_PER_DAY = 86_400_000_000_000
+
+# ET DST transitions (UTC epoch seconds) and the UTC offset in effect from each one
+_ET_TRANSITIONS_S = np.array(ET_TZ._utc_transition_times, dtype='datetime64[s]').astype('int64')
+_ET_OFFSETS_NS = np.array(
+    [int(utcoffset.total_seconds()) * 1_000_000_000 for utcoffset, _, _ in ET_TZ._transition_info],
+    dtype='int64'
+)
+
+
+def to_et(datetimes):
+    """Convert a datetime Series or DatetimeIndex to ET (naive values are taken as UTC)."""
+    if isinstance(datetimes, pd.Series):
+        if datetimes.dt.tz is None:
+            datetimes = datetimes.dt.tz_localize('UTC')
+        return datetimes.dt.tz_convert(ET_TZ)
+    if datetimes.tz is None:
+        datetimes = datetimes.tz_localize('UTC')
+    return datetimes.tz_convert(ET_TZ)
+
+
+def wall_clock_ns(datetimes) -> np.ndarray:
+    """
+    ET wall-clock time of tz-aware ET datetimes as naive int64 nanoseconds.
+
+    Filtering and grouping on these plain ints avoids tz-aware timestamp and
+    datetime.time/date object operations. The UTC offset comes from one
+    searchsorted over the DST transitions instead of a per-row tz lookup.
+    """
+    values = datetimes.array
+    missing = values.isna()
+    if missing.any():
+        et_ns = np.full(len(values), np.iinfo('int64').min)  # NaT
+        et_ns[~missing] = wall_clock_ns(datetimes[~missing])
+        return et_ns
+    ns_per_unit = np.timedelta64(1, values.unit) // np.timedelta64(1, 'ns')
+    if values.tz is None:
+        return values.asi8 * ns_per_unit
+    utc_ns = values.asi8 * ns_per_unit
+    if not len(utc_ns):
+        return utc_ns
+    utc_s = utc_ns // 1_000_000_000
+    # Only the few transitions inside the bars' own range need to be searched
+    first = np.searchsorted(_ET_TRANSITIONS_S, utc_s.min(), side='right') - 1
+    last = np.searchsorted(_ET_TRANSITIONS_S, utc_s.max(), side='right')
+    if last - first == 1:
+        return utc_ns + _ET_OFFSETS_NS[first]
+    segment = first + np.searchsorted(_ET_TRANSITIONS_S[first + 1:last], utc_s, side='right')
+    return utc_ns + _ET_OFFSETS_NS[segment]
+
+
+def market_hours_mask(et_ns: np.ndarray) -> np.ndarray:
+    """Bars from MARKET_OPEN_MIN to MARKET_CLOSE_MIN ET, inclusive."""
+    minute_of_day = (et_ns // NS_PER_MINUTE) % 1440
+    return (minute_of_day >= MARKET_OPEN_MIN) & (minute_of_day <= MARKET_CLOSE_MIN)
+
+
+def day_numbers(et_ns: np.ndarray, index) -> pd.Series:
+    """Day number (days since epoch, ET) per row, for use as a groupby key."""
+    return pd.Series(et_ns // NS_PER_DAY, index=index)
+
+
+def market_hours_frame(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Market-hours bars in time order from a frame on a UTC DatetimeIndex, with the
+    timestamps converted to ET and moved into a Datetime column.
+
+    Runs as one lazy Polars query when polars is installed, otherwise in pandas.
+    """
+    if pl is not None:
+        minute_of_day = pl.col('Datetime').dt.hour().cast(pl.Int32) * 60 + pl.col('Datetime').dt.minute()
+        return (
+            pl.from_pandas(bars.rename_axis('Datetime').reset_index())
+            .lazy()
+            .with_columns(pl.col('Datetime').dt.convert_time_zone(ET_TZ.zone))
+            .filter(minute_of_day.is_between(MARKET_OPEN_MIN, MARKET_CLOSE_MIN))
+            .sort('Datetime')
+            .collect()
+            .to_pandas()
+        )
+
+    et_bars = bars.set_axis(to_et(bars.index))
+    filtered = et_bars[market_hours_mask(wall_clock_ns(et_bars.index))]
+    if not filtered.index.is_monotonic_increasing:
+        filtered = filtered.sort_index()
+    return filtered.rename_axis('Datetime').reset_index()
+
+
+def format_day(day: int) -> str:
+    """'2025-01-02' for a day number from day_numbers()."""
+    return f"{pd.Timestamp(day, unit='D'):%Y-%m-%d}"
+
+
+def day_label(day: int) -> str:
+    """'2025-01-02 (Thursday)' for a day number from day_numbers()."""
+    date = pd.Timestamp(day, unit='D')
+    return f"{date:%Y-%m-%d} ({date:%A})"
+
+
+def time_date_arrays(datetimes: pd.Series) -> dict:
+    """
+    Time and Date columns for the CSV files as Arrow arrays cast from the ET
+    wall-clock timestamps (written as 09:30:00 / 2025-01-02), so no
+    datetime.time/date objects are created for every row.
+    """
+    naive = pa.array(datetimes.dt.tz_localize(None))
+    return {'Time': pc.cast(naive, pa.time32('s')), 'Date': pc.cast(naive, pa.date32())}
+
+
+# Row templates for format_bar_rows(), matching table_header()
+_BAR_ROW_FORMAT_NO_VOLUME = "{:<12} ${:<9.2f} ${:<9.2f} ${:<9.2f} ${:<9.2f}".format
+_BAR_ROW_FORMAT = "{:<12} ${:<9.2f} ${:<9.2f} ${:<9.2f} ${:<9.2f} {:<15,}".format
+
+# 'HH:MM' for each minute of the day
+_MINUTE_LABELS = np.array([f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(1440)])
+
+
+def table_header(volume: bool = True) -> str:
+    header = f"{'Time (ET)':<12} {'Open':<10} {'High':<10} {'Low':<10} {'Close':<10}"
+    if volume:
+        header += f" {'Volume':<15}"
+    return header
+
+
+def format_bar_rows(frame: pd.DataFrame, datetime_col: str = 'Datetime', volume: bool = True) -> pd.Series:
+    """Table rows (matching table_header), one string per bar, from one precompiled template."""
+    et_ns = wall_clock_ns(frame[datetime_col])
+    times = np.where(
+        frame[datetime_col].isna().to_numpy(), 'N/A', _MINUTE_LABELS[(et_ns // NS_PER_MINUTE) % 1440]
+    ).tolist()
+    columns = [frame[col].tolist() for col in ('Open', 'High', 'Low', 'Close')]
+    if volume:
+        columns.append(frame['Volume'].astype('int64').tolist())
+    row_format = _BAR_ROW_FORMAT if volume else _BAR_ROW_FORMAT_NO_VOLUME
+    return pd.Series([row_format(*values) for values in zip(times, *columns)], index=frame.index)
+
+
+def write_csv_table(table: pa.Table, output_file: str):
+    """
+    Write an Arrow table as CSV with an unquoted header and unquoted strings, as
+    to_csv does. A table with a value that needs quoting (comma, quote, newline)
+    is written with every string quoted instead.
+
+    Arrow prints integral floats without the '.0' that to_csv keeps (71226.0 is
+    written as 71226). Type-inferring readers, Arrow's included, read that as an
+    integer, so read these files with CSV_COLUMN_TYPES.
+    """
+    try:
+        with pa.OSFile(output_file, 'wb') as sink:
+            sink.write((','.join(table.column_names) + '\n').encode())
+            pacsv.write_csv(table, sink, write_options=pacsv.WriteOptions(include_header=False, quoting_style='none'))
+    except pa.ArrowInvalid:
+        pacsv.write_csv(table, output_file, write_options=pacsv.WriteOptions(quoting_style='needed'))
+
+
+def save_csv(frame: pd.DataFrame, output_file: str, text_columns=(), extra_columns=None, columns=None):
+    """
+    Write with Arrow's CSV writer (see write_csv_table for how the text differs from to_csv).
+
+    Args:
+        frame: Data to write
+        output_file: CSV path
+        text_columns: Columns converted to Arrow strings first (same text as to_csv)
+        extra_columns: Name -> Arrow array appended after the frame's columns
+        columns: Optional final column order
+    """
+    csv_data = frame.astype({col: 'string[pyarrow]' for col in text_columns})
+    table = pa.Table.from_pandas(csv_data, preserve_index=False)
+    for name, values in (extra_columns or {}).items():
+        table = table.append_column(name, values)
+    if columns:
+        table = table.select(columns)
+    write_csv_table(table, output_file)
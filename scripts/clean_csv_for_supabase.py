@@ -1,13 +1,17 @@
 """
 Clean CSV file for Supabase import by converting float values to integers
 for volume and trade_count columns.
+Also accepts the Parquet copy written by combine_all_100_stocks_2years.py.
 """
+import os
 import pandas as pd
+import pyarrow.csv as pacsv
+from bar_pipeline import CSV_TEXT_COLUMNS
 
 def clean_csv_for_supabase(input_file: str, output_file: str = None):
-    """Clean CSV by converting volume and trade_count to integers."""
+    """Clean CSV (or Parquet) by converting volume and trade_count to integers."""
     if output_file is None:
-        output_file = input_file.replace('.csv', '_cleaned.csv')
+        output_file = os.path.splitext(input_file)[0] + '_cleaned.csv'
     
     print("=" * 80)
     print("CLEANING CSV FOR SUPABASE IMPORT")
@@ -17,8 +21,17 @@ def clean_csv_for_supabase(input_file: str, output_file: str = None):
     print()
     
     # Read CSV
-    print("📖 Reading CSV...")
-    df = pd.read_csv(input_file)
+    if input_file.endswith('.parquet'):
+        print("📖 Reading Parquet...")
+        df = pd.read_parquet(input_file)
+    else:
+        print("📖 Reading CSV...")
+        # Multithreaded Arrow parser with explicit types for the text columns
+        df = pacsv.read_csv(
+            input_file,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(column_types=CSV_TEXT_COLUMNS)
+        ).to_pandas()
     print(f"✅ Loaded {len(df):,} rows")
     
     # Convert volume and trade_count to integers (remove .0)
@@ -36,8 +49,8 @@ def clean_csv_for_supabase(input_file: str, output_file: str = None):
     
     # Convert trade_count to int (handles NaN)
     if 'trade_count' in df.columns:
-        # For trade_count, we'll keep NaN as None/null, but convert non-null values to int
-        df['trade_count'] = df['trade_count'].apply(lambda x: int(x) if pd.notna(x) else None)
+        # Nullable Int64 keeps NaN as null and writes non-null values as integers
+        df['trade_count'] = df['trade_count'].astype('Int64')
         print(f"✅ Converted trade_count to integers (preserving NULL values)")
     
     # Save cleaned CSV
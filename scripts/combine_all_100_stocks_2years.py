@@ -2,9 +2,12 @@
 Combine all 2-year stock data files into one CSV with all 100 stocks.
 """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import glob
 import os
 from datetime import datetime
+from bar_pipeline import CSV_COLUMN_TYPES, write_csv_table
 
 def combine_all_2year_data():
     """Combine all 2-year CSV files into one."""
@@ -35,24 +38,29 @@ def combine_all_2year_data():
     
     # Read and combine all files
     print("📖 Reading CSV files...")
-    all_dataframes = []
+    all_tables = []
+    read_options = pacsv.ReadOptions(use_threads=True)
+    convert_options = pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES)
     
     for file in sorted(files):
         try:
-            df = pd.read_csv(file)
-            print(f"   ✅ {file}: {len(df):,} rows, {df['Symbol'].nunique()} stocks")
-            all_dataframes.append(df)
+            table = pacsv.read_csv(file, read_options=read_options, convert_options=convert_options)
+            num_symbols = len(table.column('Symbol').unique())
+            print(f"   ✅ {file}: {table.num_rows:,} rows, {num_symbols} stocks")
+            all_tables.append(table)
         except Exception as e:
             print(f"   ❌ Error reading {file}: {e}")
             continue
     
-    if not all_dataframes:
+    if not all_tables:
         print("❌ No data to combine!")
         return None
     
     print()
     print("🔄 Combining data...")
-    combined_df = pd.concat(all_dataframes, ignore_index=True)
+    # Zero-copy concat in Arrow; convert to pandas once for dedup and stats
+    combined_df = pa.concat_tables(all_tables, promote_options='default').to_pandas()
+    del all_tables
     
     print(f"   Total rows before deduplication: {len(combined_df):,}")
     
@@ -65,8 +73,15 @@ def combine_all_2year_data():
     if duplicates_removed > 0:
         print(f"   Removed {duplicates_removed:,} duplicate rows")
     
-    # Sort by Symbol and Datetime
-    combined_df = combined_df.sort_values(['Symbol', 'Datetime'])
+    # Sort by Symbol only: each file is already in Datetime order per symbol, and a
+    # stable sort keeps that order. Fall back to the full sort if a symbol split
+    # across files ends up out of order.
+    combined_df = combined_df.sort_values('Symbol', kind='stable')
+    symbols = combined_df['Symbol'].to_numpy()
+    datetimes = combined_df['Datetime'].to_numpy()
+    in_order = ((symbols[1:] != symbols[:-1]) | (datetimes[1:] >= datetimes[:-1])).all()
+    if not in_order:
+        combined_df = combined_df.sort_values(['Symbol', 'Datetime'], kind='stable')
     
     print(f"   Total rows after deduplication: {len(combined_df):,}")
     print()
@@ -104,8 +119,10 @@ def combine_all_2year_data():
         'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH'
     ]
     
-    top50_in_data = [s for s in top50_list if s in unique_stocks]
-    stocks_51_100_in_data = [s for s in stocks_51_100_list if s in unique_stocks]
+    # Build the membership set once (`in` on the NumPy array is a linear scan)
+    unique_set = set(unique_stocks.tolist())
+    top50_in_data = [s for s in top50_list if s in unique_set]
+    stocks_51_100_in_data = [s for s in stocks_51_100_list if s in unique_set]
     
     print(f"   Top 50 stocks: {len(top50_in_data)}/{len(top50_list)}")
     print(f"   Stocks 51-100: {len(stocks_51_100_in_data)}/{len(stocks_51_100_list)}")
@@ -113,7 +130,7 @@ def combine_all_2year_data():
     
     # Check for missing stocks
     all_expected = set(top50_list + stocks_51_100_list)
-    missing = all_expected - set(unique_stocks)
+    missing = all_expected - unique_set
     
     if missing:
         print(f"⚠️  Missing stocks ({len(missing)}): {', '.join(sorted(missing))}")
@@ -124,27 +141,39 @@ def combine_all_2year_data():
     print("DATA STATISTICS BY STOCK")
     print("=" * 80)
     
-    stats_list = []
-    for symbol in sorted(unique_stocks):
-        stock_data = combined_df[combined_df['Symbol'] == symbol]
-        if not stock_data.empty:
-            stats_list.append({
-                'Symbol': symbol,
-                'Data Points': len(stock_data),
-                'Date Range': f"{stock_data['Date'].min()} to {stock_data['Date'].max()}",
-                'Trading Days': stock_data['Date'].nunique(),
-                'Avg Price': f"${stock_data['Close'].mean():.2f}",
-                'High': f"${stock_data['High'].max():.2f}",
-                'Low': f"${stock_data['Low'].min():.2f}",
-                'Total Volume': f"{int(stock_data['Volume'].sum()):,}"
-            })
-    
-    stats_df = pd.DataFrame(stats_list)
-    print(stats_df.to_string(index=False))
+    # One grouped pass over the data (categorical codes, no per-symbol mask scans)
+    combined_df['Symbol'] = combined_df['Symbol'].astype('category')
+    agg = combined_df.groupby('Symbol', sort=True, observed=True).agg(
+        data_points=('Datetime', 'size'),
+        date_min=('Date', 'min'),
+        date_max=('Date', 'max'),
+        trading_days=('Date', 'nunique'),
+        avg_price=('Close', 'mean'),
+        high=('High', 'max'),
+        low=('Low', 'min'),
+        total_volume=('Volume', 'sum')
+    )
+    
+    # Format the aggregated frame column-wise for display
+    stats_df = agg.reset_index().assign(**{
+        'Symbol': lambda d: d['Symbol'].astype(str),
+        'Data Points': lambda d: d['data_points'],
+        'Date Range': lambda d: d['date_min'].astype(str) + ' to ' + d['date_max'].astype(str),
+        'Trading Days': lambda d: d['trading_days'],
+        'Avg Price': lambda d: d['avg_price'].map('${:.2f}'.format),
+        'High': lambda d: d['high'].map('${:.2f}'.format),
+        'Low': lambda d: d['low'].map('${:.2f}'.format),
+        'Total Volume': lambda d: d['total_volume'].astype('int64').map('{:,}'.format)
+    })
+    stats_columns = ['Symbol', 'Data Points', 'Date Range', 'Trading Days', 'Avg Price', 'High', 'Low', 'Total Volume']
+    print(stats_df[stats_columns].to_string(index=False))
     
     # Save combined file
     output_file = f"all_100_stocks_30min_2years_alpaca_{datetime.now().strftime('%Y%m%d')}.csv"
-    combined_df.to_csv(output_file, index=False)
+    write_csv_table(pa.Table.from_pandas(combined_df.astype({'Symbol': str}), preserve_index=False), output_file)
+    # Typed, compressed copy for downstream readers (no CSV re-parsing)
+    parquet_file = output_file.replace('.csv', '.parquet')
+    combined_df.to_parquet(parquet_file, compression='zstd', index=False)
     
     print()
     print("=" * 80)
@@ -154,6 +183,7 @@ def combine_all_2year_data():
     print(f"   Total rows: {len(combined_df):,}")
     print(f"   Total stocks: {num_stocks}")
     print(f"   File size: {os.path.getsize(output_file) / (1024*1024):.1f} MB")
+    print(f"📄 Parquet: {parquet_file} ({os.path.getsize(parquet_file) / (1024*1024):.1f} MB)")
     print()
     
     return combined_df
@@ -29,10 +29,16 @@ class Config:
     ALPACA_API_KEY = os.getenv('ALPACA_API_KEY', '')
     ALPACA_SECRET_KEY = os.getenv('ALPACA_SECRET_KEY', '')
     ALPACA_BASE_URL = os.getenv('ALPACA_BASE_URL', 'https://paper-api.alpaca.markets')
+    # Market data feed for historical bars ('iex' on the free plan, 'sip' with a subscription);
+    # empty uses Alpaca's default for the account
+    ALPACA_DATA_FEED = os.getenv('ALPACA_DATA_FEED', '')
     
     # For Alpha Vantage (free stock data API)
     ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', '')
     
+    # For Polygon (batched real-time snapshot quotes; falls back to yfinance if unset)
+    POLYGON_API_KEY = os.getenv('POLYGON_API_KEY', '')
+    
     # Trading settings
     TRADE_TIME = '12:00'  # Noon in 24-hour format
     TIMEZONE = os.getenv('TIMEZONE', 'America/New_York')
@@ -40,6 +46,11 @@ class Config:
     # Position sizing (dollar amount per stock)
     POSITION_SIZE = float(os.getenv('POSITION_SIZE', '1000.0'))
     
+    # Local cache for downloaded intraday bars (see bar_cache.py)
+    BAR_CACHE_PATH = os.getenv('BAR_CACHE_PATH', 'bar_cache.db')
+    # Per-symbol Parquet files of Alpaca 30-minute bars (see alpaca_fetch.py)
+    ALPACA_CACHE_DIR = os.getenv('ALPACA_CACHE_DIR', 'alpaca_cache')
+    
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'trading_bot.log')
@@ -1,14 +1,140 @@
 """
-Execute all SQL batches via MCP Supabase execute_sql.
+Execute all SQL batches against Supabase Postgres.
 This script reads each batch file and executes it.
+Batches run concurrently through an asyncpg pool, one transaction per batch;
+without asyncpg or a Postgres URL it falls back to MCP instructions.
+
+Given the combined CSV instead (python execute_all_batches.py <csv>), the rows
+are streamed with COPY and no batch SQL files are needed.
 """
-import glob
+import asyncio
+import csv
 import os
+import re
 import sys
 
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+BATCH_FILE_PATTERN = re.compile(r'batch_(\d+)_execute\.sql$')
+MAX_CONCURRENT_BATCHES = 8
+
+# COPY lands the raw CSV text in a staging table; the INSERT casts it into place.
+# Naive timestamps are read as America/New_York, like the generated batch SQL.
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE stock_ohlc_30min_staging (
+    datetime text, open text, high text, low text, close text, volume text,
+    trade_count text, vwap text, date text, time text, symbol text
+) ON COMMIT DROP;
+SET LOCAL TimeZone = 'America/New_York';
+"""
+
+INSERT_FROM_STAGING_SQL = """
+INSERT INTO stock_ohlc_30min (symbol, datetime, date, time, open, high, low, close, volume, trade_count, vwap)
+SELECT upper(symbol), datetime::timestamptz, date::date, time::time,
+       open::double precision, high::double precision, low::double precision, close::double precision,
+       volume::numeric::bigint, trade_count::numeric::bigint, vwap::double precision
+FROM stock_ohlc_30min_staging
+ON CONFLICT (symbol, datetime) DO NOTHING;
+"""
+
+
+def get_database_url():
+    """Get the Postgres URL from the app config (DATABASE_URL or Supabase settings)."""
+    try:
+        from app.config import get_config
+        url = get_config().database.url
+    except Exception:
+        url = os.getenv('DATABASE_URL')
+    
+    if url and url.startswith(('postgresql://', 'postgres://')):
+        return url
+    return None
+
+
+async def execute_batches(dsn: str, batches_data):
+    """Execute batches concurrently; returns the list of failed batch numbers."""
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=MAX_CONCURRENT_BATCHES)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    failed = []
+    
+    def read_sql(path):
+        with open(path, 'r') as f:
+            return f.read()
+    
+    async def run_batch(batch):
+        async with semaphore, pool.acquire() as conn:
+            try:
+                # Read only while the batch is in flight: at most one file per connection in memory
+                sql = await asyncio.to_thread(read_sql, batch['path'])
+                async with conn.transaction():
+                    await conn.execute(sql)
+                print(f"✅ Executed batch {batch['batch_num']}")
+            except Exception as e:
+                print(f"❌ Batch {batch['batch_num']} failed: {e}")
+                failed.append(batch['batch_num'])
+    
+    try:
+        await asyncio.gather(*(run_batch(batch) for batch in batches_data))
+    finally:
+        await pool.close()
+    
+    return sorted(failed)
+
+
+async def copy_csv(dsn: str, csv_file: str) -> int:
+    """Stream a combined CSV into stock_ohlc_30min with COPY; returns rows inserted."""
+    with open(csv_file, newline='') as f:
+        columns = [name.strip().lower() for name in next(csv.reader(f))]
+    
+    conn = await asyncpg.connect(dsn)
+    try:
+        async with conn.transaction():
+            await conn.execute(CREATE_STAGING_SQL)
+            await conn.copy_to_table(
+                'stock_ohlc_30min_staging', source=csv_file, columns=columns, format='csv', header=True
+            )
+            status = await conn.execute(INSERT_FROM_STAGING_SQL)
+    finally:
+        await conn.close()
+    
+    # Status is "INSERT 0 <rows>"
+    return int(status.split()[-1])
+
+
+def copy_main(csv_file: str):
+    """Load the combined CSV directly, skipping batch SQL generation."""
+    print("=" * 80)
+    print("COPYING CSV INTO SUPABASE")
+    print("=" * 80)
+    print(f"File: {csv_file}")
+    print()
+    
+    dsn = get_database_url()
+    if asyncpg is None or not dsn:
+        print("❌ COPY needs asyncpg and a Postgres DATABASE_URL (or Supabase settings)")
+        return False
+    
+    try:
+        inserted = asyncio.run(copy_csv(dsn, csv_file))
+    except Exception as e:
+        print(f"❌ COPY failed: {e}")
+        return False
+    
+    print(f"✅ Inserted {inserted:,} rows (existing rows skipped)")
+    return True
+
+
 def main():
     # Find all batch SQL files
-    batch_files = sorted(glob.glob('batch_*_execute.sql'), key=lambda x: int(x.split('_')[1]))
+    batch_files = [
+        (int(m.group(1)), entry)
+        for entry in os.scandir('.')
+        if (m := BATCH_FILE_PATTERN.match(entry.name))
+    ]
+    batch_files.sort(key=lambda item: item[0])
     
     if not batch_files:
         print("❌ No batch SQL files found!")
@@ -21,30 +147,42 @@ def main():
     print(f"Total rows: ~696,818")
     print()
     
-    # Read all batches and prepare for execution
+    # Collect batch metadata only; SQL is read from disk when each batch executes
     batches_data = []
-    for i, batch_file in enumerate(batch_files, 1):
+    for i, (batch_num, entry) in enumerate(batch_files, 1):
+        batch_file = entry.name
         try:
-            with open(batch_file, 'r') as f:
-                sql = f.read()
-            
-            batch_num = int(batch_file.split('_')[1])
-            batches_data.append({
-                'batch_num': batch_num,
-                'file': batch_file,
-                'sql': sql,
-                'size': len(sql)
-            })
-            
-            if i <= 5 or i % 50 == 0:
-                print(f"✅ Loaded batch {batch_num}: {len(sql):,} chars")
-        except Exception as e:
-            print(f"❌ Error loading {batch_file}: {e}")
+            size = entry.stat().st_size
+        except OSError as e:
+            print(f"❌ Error reading {batch_file}: {e}")
             return False
+        
+        batches_data.append({
+            'batch_num': batch_num,
+            'file': batch_file,
+            'path': entry.path,
+            'size': size
+        })
+        
+        if i <= 5 or i % 50 == 0:
+            print(f"✅ Found batch {batch_num}: {size:,} bytes")
     
     print()
-    print(f"✅ All {len(batches_data)} batches loaded successfully")
+    print(f"✅ All {len(batches_data)} batches found")
     print()
+    
+    dsn = get_database_url()
+    if asyncpg is not None and dsn:
+        print("=" * 80)
+        print(f"EXECUTING BATCHES ({MAX_CONCURRENT_BATCHES} concurrent connections)")
+        print("=" * 80)
+        failed = asyncio.run(execute_batches(dsn, batches_data))
+        print()
+        print(f"✅ Executed {len(batches_data) - len(failed)}/{len(batches_data)} batches")
+        if failed:
+            print(f"❌ Failed batches: {', '.join(str(n) for n in failed)}")
+        return not failed
+    
     print("=" * 80)
     print("BATCHES READY FOR EXECUTION")
     print("=" * 80)
@@ -54,7 +192,7 @@ def main():
     print()
     print("Batch summary:")
     for batch in batches_data[:10]:
-        print(f"  Batch {batch['batch_num']}: {batch['size']:,} chars")
+        print(f"  Batch {batch['batch_num']}: {batch['size']:,} bytes")
     if len(batches_data) > 10:
         print(f"  ... and {len(batches_data) - 10} more batches")
     
@@ -66,5 +204,8 @@ def main():
     return True
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1:
+        copy_main(sys.argv[1])
+    else:
+        main()
 
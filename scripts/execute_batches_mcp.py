@@ -2,20 +2,28 @@
 Helper script to execute SQL batches via MCP Supabase execute_sql.
 This script reads SQL files and prints instructions for MCP execution.
 """
-import glob
 import os
+import re
+
+BATCH_FILE_PATTERN = re.compile(r'batch_(\d+)_execute\.sql$')
+
 
 def main():
-    batch_files = sorted(glob.glob('batch_*_execute.sql'), key=lambda x: int(x.split('_')[1]))
+    # One scandir pass; DirEntry caches stat info, so no extra getsize() per file
+    batch_files = [
+        (int(m.group(1)), entry)
+        for entry in os.scandir('.')
+        if (m := BATCH_FILE_PATTERN.match(entry.name))
+    ]
+    batch_files.sort(key=lambda item: item[0])
     
     print(f"Found {len(batch_files)} batch SQL files")
     print(f"\nTo execute via MCP Supabase execute_sql:")
     print(f"1. Read each batch file")
     print(f"2. Execute via mcp_supabase_execute_sql tool")
     print(f"\nBatch files:")
-    for i, batch_file in enumerate(batch_files[:10], 1):
-        size = os.path.getsize(batch_file)
-        print(f"  {i}. {batch_file} ({size:,} bytes)")
+    for i, (_, entry) in enumerate(batch_files[:10], 1):
+        print(f"  {i}. {entry.name} ({entry.stat().st_size:,} bytes)")
     if len(batch_files) > 10:
         print(f"  ... and {len(batch_files) - 10} more")
 
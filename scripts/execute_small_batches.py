@@ -2,20 +2,28 @@
 Execute small batches via MCP Supabase execute_sql.
 Reads batch files and provides SQL for execution.
 """
-import glob
 import os
+import re
+
+BATCH_FILE_PATTERN = re.compile(r'small_batch_(\d+)_execute\.sql$')
+
 
 def main():
-    batch_files = sorted(glob.glob('small_batch_*_execute.sql'), key=lambda x: int(x.split('_')[2]))
+    # One scandir pass; DirEntry caches stat info, so no extra getsize() per file
+    batch_files = [
+        (int(m.group(1)), entry)
+        for entry in os.scandir('.')
+        if (m := BATCH_FILE_PATTERN.match(entry.name))
+    ]
+    batch_files.sort(key=lambda item: item[0])
     
     print(f"Found {len(batch_files)} small batch files")
     print(f"\nTo execute all batches:")
     print(f"1. Read each batch file")
     print(f"2. Execute via MCP Supabase execute_sql tool")
     print(f"\nBatch files ready:")
-    for i, batch_file in enumerate(batch_files[:20], 1):
-        size = os.path.getsize(batch_file)
-        print(f"  {i}. {batch_file} ({size:,} bytes)")
+    for i, (_, entry) in enumerate(batch_files[:20], 1):
+        print(f"  {i}. {entry.name} ({entry.stat().st_size:,} bytes)")
     if len(batch_files) > 20:
         print(f"  ... and {len(batch_files) - 20} more batches")
     
@@ -3,12 +3,17 @@ Fetch Apple (AAPL) stock prices at 30-minute intervals for the past week.
 Only includes prices during market hours (9:30 AM - 4:00 PM ET).
 """
 import yfinance as yf
+import sys
 import pandas as pd
 from datetime import datetime, timedelta
-import pytz
+from bar_cache import cached_history
+from bar_pipeline import (
+    YF_EXTRA_COLUMNS, day_label, day_numbers, format_bar_rows, format_day, market_hours_mask,
+    save_csv, table_header, time_date_arrays, to_et, wall_clock_ns
+)
 
-def fetch_aapl_30min_week():
-    """Fetch AAPL prices at 30-minute intervals for the past week."""
+def fetch_aapl_30min_week(verbose: bool = True):
+    """Fetch AAPL prices at 30-minute intervals for the past week (verbose=False skips the per-bar tables)."""
     
     # Get date range (past 7 days)
     end_date = datetime.now()
@@ -28,11 +33,11 @@ def fetch_aapl_30min_week():
     # Try to fetch 30-minute data for the past week
     # Note: yfinance may have limitations on historical intraday data
     try:
-        # Fetch 30-minute interval data
-        data = ticker.history(
+        # Fetch 30-minute interval data (only the part not already in the local cache)
+        data = cached_history(
+            ticker, "AAPL", '30m',
             start=start_date.strftime('%Y-%m-%d'),
-            end=end_date.strftime('%Y-%m-%d'),
-            interval='30m'
+            end=end_date.strftime('%Y-%m-%d')
         )
         
         if data.empty:
@@ -50,68 +55,58 @@ def fetch_aapl_30min_week():
                 print("❌ Could not fetch intraday data.")
                 return None
         
-        # Reset index to get Datetime as a column
+        # Drop the unused yfinance columns (fallback fetches), then get Datetime as a column
+        data = data.drop(columns=[c for c in YF_EXTRA_COLUMNS if c in data.columns])
         data = data.reset_index()
         
-        # Filter for market hours (9:30 AM - 4:00 PM ET)
-        # Convert to ET timezone
-        et_tz = pytz.timezone('America/New_York')
-        
-        # Ensure Datetime column is timezone-aware
+        # Convert to ET timezone (UTC assumed if no timezone)
         if 'Datetime' in data.columns:
-            if data['Datetime'].dt.tz is None:
-                # Assume UTC if no timezone
-                data['Datetime'] = pd.to_datetime(data['Datetime']).dt.tz_localize('UTC')
-            # Convert to ET
-            data['Datetime'] = data['Datetime'].dt.tz_convert(et_tz)
-            data['Time'] = data['Datetime'].dt.time
-            data['Date'] = data['Datetime'].dt.date
+            data['Datetime'] = to_et(data['Datetime'])
         else:
             # If index is datetime
-            if data.index.tz is None:
-                data.index = pd.to_datetime(data.index).tz_localize('UTC')
-            data.index = data.index.tz_convert(et_tz)
-            data['Time'] = data.index.time
-            data['Date'] = data.index.date
+            data.index = to_et(pd.to_datetime(data.index))
             data['Datetime'] = data.index
         
-        # Filter for market hours (9:30 AM - 4:00 PM)
-        market_open = pd.Timestamp('09:30').time()
-        market_close = pd.Timestamp('16:00').time()
-        
-        # Filter data
-        filtered_data = data[
-            (data['Time'] >= market_open) & 
-            (data['Time'] <= market_close)
-        ].copy()
+        # Filter for market hours (9:30 AM - 4:00 PM ET) on the ET wall-clock ints
+        et_ns = wall_clock_ns(data['Datetime'])
+        keep = market_hours_mask(et_ns)
         
-        if filtered_data.empty:
+        if keep.any():
+            # One boolean take; pandas' copy-on-write makes a further .copy() unnecessary
+            filtered_data = data[keep]
+            et_ns = et_ns[keep]
+        else:
             print("⚠️  No data found for market hours.")
             print("   Showing all available data:")
-            filtered_data = data.copy()
+            filtered_data = data
         
-        # Sort by datetime
-        filtered_data = filtered_data.sort_values('Datetime')
+        # Day numbers stand in for datetime.date objects (grouping, date range, day count)
+        day_int = day_numbers(et_ns, filtered_data.index)
+        
+        # Sort by datetime (Yahoo returns bars in order, so normally nothing to do)
+        if not filtered_data['Datetime'].is_monotonic_increasing:
+            filtered_data = filtered_data.sort_values('Datetime')
         
         # Display results
         print(f"✅ Found {len(filtered_data)} data points")
-        print()
-        print("=" * 80)
-        print("AAPL PRICE DATA (30-MINUTE INTERVALS)")
-        print("=" * 80)
-        print()
+        # Per-bar tables (skipped with verbose=False / --quiet)
+        if verbose:
+            print()
+            print("=" * 80)
+            print("AAPL PRICE DATA (30-MINUTE INTERVALS)")
+            print("=" * 80)
+            print()
         
-        # Group by date
-        for date, group in filtered_data.groupby('Date'):
-            print(f"\n📅 {date} ({pd.Timestamp(date).strftime('%A')})")
-            print("-" * 80)
-            print(f"{'Time (ET)':<12} {'Open':<10} {'High':<10} {'Low':<10} {'Close':<10} {'Volume':<15}")
-            print("-" * 80)
-            
-            for _, row in group.iterrows():
-                time_str = row['Time'].strftime('%H:%M')
-                print(f"{time_str:<12} ${row['Open']:<9.2f} ${row['High']:<9.2f} "
-                      f"${row['Low']:<9.2f} ${row['Close']:<9.2f} {int(row['Volume']):<15,}")
+            # Format all rows column-wise once, then print each day's block in one call
+            row_lines = format_bar_rows(filtered_data)
+        
+            # Group by day number; rows are already in time order, so groups need no sorting
+            for day, lines in row_lines.groupby(day_int, sort=False):
+                print(f"\n📅 {day_label(day)}")
+                print("-" * 80)
+                print(table_header())
+                print("-" * 80)
+                print('\n'.join(lines.tolist()))
         
         # Summary statistics
         print()
@@ -119,8 +114,8 @@ def fetch_aapl_30min_week():
         print("SUMMARY STATISTICS")
         print("=" * 80)
         print(f"Total Data Points: {len(filtered_data)}")
-        print(f"Date Range: {filtered_data['Date'].min()} to {filtered_data['Date'].max()}")
-        print(f"Trading Days: {filtered_data['Date'].nunique()}")
+        print(f"Date Range: {format_day(day_int.min())} to {format_day(day_int.max())}")
+        print(f"Trading Days: {day_int.nunique()}")
         print(f"Average Price: ${filtered_data['Close'].mean():.2f}")
         print(f"High Price: ${filtered_data['High'].max():.2f}")
         print(f"Low Price: ${filtered_data['Low'].min():.2f}")
@@ -129,9 +124,16 @@ def fetch_aapl_30min_week():
         
         # Save to CSV
         output_file = f"aapl_30min_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv"
-        filtered_data.to_csv(output_file, index=False)
+        save_csv(
+            filtered_data, output_file, text_columns=('Datetime',),
+            extra_columns=time_date_arrays(filtered_data['Datetime'])
+        )
+        # Typed copy that keeps the timezone-aware Datetime column
+        parquet_file = output_file.replace('.csv', '.parquet')
+        filtered_data.to_parquet(parquet_file, index=False)
         print()
         print(f"✅ Data saved to: {output_file}")
+        print(f"✅ Parquet saved to: {parquet_file}")
         
         return filtered_data
         
@@ -143,7 +145,7 @@ def fetch_aapl_30min_week():
 
 
 if __name__ == '__main__':
-    data = fetch_aapl_30min_week()
+    data = fetch_aapl_30min_week(verbose='--quiet' not in sys.argv[1:])
     
     if data is not None:
         print()
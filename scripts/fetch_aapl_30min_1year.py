@@ -6,12 +6,18 @@ Note: Yahoo Finance typically limits intraday data to ~60 days.
 This script will fetch what's available and note any limitations.
 """
 import yfinance as yf
+import sys
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import pytz
+from bar_cache import cached_history
+from bar_pipeline import (
+    YF_EXTRA_COLUMNS, day_label, day_numbers, format_bar_rows, format_day, market_hours_mask,
+    save_csv, table_header, time_date_arrays, to_et, wall_clock_ns
+)
 
-def fetch_aapl_30min_1year():
-    """Fetch AAPL prices at 30-minute intervals for the past 1 year."""
+def fetch_aapl_30min_1year(verbose: bool = True):
+    """Fetch AAPL prices at 30-minute intervals for the past 1 year (verbose=False skips the bar tables)."""
     
     # Get date range (1 year from most recent market day)
     end_date = datetime.now()
@@ -37,22 +43,33 @@ def fetch_aapl_30min_1year():
     # Fetch last 60 days first (most recent data)
     print("Fetching most recent 60 days of 30-minute data...")
     try:
-        recent_data = ticker.history(period='60d', interval='30m')
+        # Equivalent of period='60d', served from the local cache where possible
+        recent_data = cached_history(ticker, "AAPL", '30m', start=end_date - timedelta(days=60), end=end_date)
         if not recent_data.empty:
             print(f"✅ Fetched {len(recent_data)} data points for recent period")
             all_data.append(recent_data)
     except Exception as e:
         print(f"⚠️  Error fetching recent data: {e}")
     
-    # For older data, we'll need to use daily data (Yahoo Finance limitation)
-    # But let's try to get as much 30-minute data as possible
+    # Yahoo only serves the last 60 days of 30-minute bars, so the cache requests
+    # nothing older; bars stored by earlier runs are still returned
     print("\nAttempting to fetch additional historical data...")
+    try:
+        older_data = cached_history(ticker, "AAPL", '30m', start=start_date, end=end_date - timedelta(days=60))
+        if not older_data.empty:
+            print(f"✅ Fetched {len(older_data)} additional data points")
+            all_data.insert(0, older_data)  # Keep chunks in time order
+    except Exception as e:
+        print(f"⚠️  Error fetching historical data: {e}")
     
     # Combine all data
     if all_data:
-        data = pd.concat(all_data)
-        data = data.sort_index()
-        data = data[~data.index.duplicated(keep='first')]  # Remove duplicates
+        # A single chunk is used as-is; sort/dedup only when chunks were merged
+        data = all_data[0] if len(all_data) == 1 else pd.concat(all_data)
+        if not data.index.is_monotonic_increasing:
+            data = data.sort_index()
+        if len(all_data) > 1:
+            data = data[~data.index.duplicated(keep='first')]  # Remove duplicates
     else:
         print("❌ Could not fetch any 30-minute data.")
         print("   Falling back to daily data...")
@@ -63,50 +80,32 @@ def fetch_aapl_30min_1year():
             print("❌ Could not fetch any data.")
             return None
     
-    # Reset index to get Datetime as a column
+    # Drop the unused yfinance columns (daily fallback), then get Datetime as a column
+    data = data.drop(columns=[c for c in YF_EXTRA_COLUMNS if c in data.columns])
     data = data.reset_index()
     
-    # Handle datetime column
-    if 'Datetime' in data.columns:
-        datetime_col = 'Datetime'
-    elif 'Date' in data.columns:
-        datetime_col = 'Date'
-    else:
-        # Use index if it's datetime
-        data['Datetime'] = data.index if isinstance(data.index, pd.DatetimeIndex) else pd.to_datetime(data.index)
-        datetime_col = 'Datetime'
-    
-    # Convert to ET timezone
-    et_tz = pytz.timezone('America/New_York')
-    
-    # Ensure Datetime column is timezone-aware
-    if data[datetime_col].dt.tz is None:
-        # Assume UTC if no timezone
-        data[datetime_col] = pd.to_datetime(data[datetime_col]).dt.tz_localize('UTC')
-    
-    # Convert to ET
-    data[datetime_col] = data[datetime_col].dt.tz_convert(et_tz)
-    data['Time'] = data[datetime_col].dt.time
-    data['Date'] = data[datetime_col].dt.date
-    
-    # Filter for market hours (9:30 AM - 4:00 PM) - only if we have time data
-    if 'Time' in data.columns:
-        market_open = pd.Timestamp('09:30').time()
-        market_close = pd.Timestamp('16:00').time()
-        
-        # Filter data (only if time is available)
-        time_mask = data['Time'].notna()
-        if time_mask.any():
-            market_hours_mask = (data['Time'] >= market_open) & (data['Time'] <= market_close)
-            filtered_data = data[time_mask & market_hours_mask].copy()
-        else:
-            # If no time data (daily data), include all
-            filtered_data = data.copy()
+    # Handle datetime column (daily bars come back as 'Date')
+    if 'Datetime' not in data.columns:
+        data = data.rename(columns={'Date': 'Datetime'})
+    
+    # Convert to ET timezone (UTC assumed if no timezone)
+    data['Datetime'] = to_et(data['Datetime'])
+    
+    # Filter for market hours (9:30 AM - 4:00 PM ET) on the ET wall-clock ints
+    et_ns = wall_clock_ns(data['Datetime'])
+    keep = data['Datetime'].notna().to_numpy()
+    if keep.any():
+        keep = keep & market_hours_mask(et_ns)
     else:
-        filtered_data = data.copy()
+        # If no time data (daily data), include all
+        keep = np.ones(len(data), dtype=bool)
+    
+    filtered_data = data[keep].copy()
+    # Day numbers stand in for datetime.date objects (grouping, date range, day count)
+    day_int = day_numbers(et_ns[keep], filtered_data.index)
     
     # Sort by datetime
-    filtered_data = filtered_data.sort_values(datetime_col)
+    filtered_data = filtered_data.sort_values('Datetime')
     
     # Display results
     print()
@@ -116,13 +115,13 @@ def fetch_aapl_30min_1year():
     print(f"✅ Found {len(filtered_data)} data points")
     
     if len(filtered_data) > 0:
-        print(f"Date Range: {filtered_data['Date'].min()} to {filtered_data['Date'].max()}")
-        print(f"Trading Days: {filtered_data['Date'].nunique()}")
+        print(f"Date Range: {format_day(day_int.min())} to {format_day(day_int.max())}")
+        print(f"Trading Days: {day_int.nunique()}")
         
         # Check if we have intraday or daily data
-        if 'Time' in filtered_data.columns and filtered_data['Time'].notna().any():
+        if filtered_data['Datetime'].notna().any():
             print(f"Data Type: 30-minute intraday intervals")
-            print(f"Average Data Points Per Day: {len(filtered_data) / filtered_data['Date'].nunique():.1f}")
+            print(f"Average Data Points Per Day: {len(filtered_data) / day_int.nunique():.1f}")
         else:
             print(f"Data Type: Daily (Yahoo Finance limitation - intraday data only available for ~60 days)")
             print("⚠️  For full 1-year 30-minute data, consider using a paid data provider.")
@@ -139,57 +138,63 @@ def fetch_aapl_30min_1year():
         if 'Volume' in filtered_data.columns:
             print(f"Total Volume: {int(filtered_data['Volume'].sum()):,}")
     
-    # Show sample of data
-    print()
-    print("=" * 80)
-    print("SAMPLE DATA (First 20 rows)")
-    print("=" * 80)
-    
-    display_cols = [datetime_col, 'Open', 'High', 'Low', 'Close']
-    if 'Volume' in filtered_data.columns:
-        display_cols.append('Volume')
-    if 'Time' in filtered_data.columns:
-        display_cols.insert(1, 'Time')
-    
-    available_cols = [col for col in display_cols if col in filtered_data.columns]
-    print(filtered_data[available_cols].head(20).to_string(index=False))
-    
-    # Group by date and show summary
-    if 'Time' in filtered_data.columns and filtered_data['Time'].notna().any():
+    # Sample and per-day tables (skipped with verbose=False / --quiet)
+    if verbose:
+        # Show sample of data
         print()
         print("=" * 80)
-        print("DATA BY DATE (Sample - First 5 days)")
+        print("SAMPLE DATA (First 20 rows)")
         print("=" * 80)
+    
+        # Time objects only for the displayed rows
+        sample = filtered_data.head(20).copy()
+        sample['Time'] = sample['Datetime'].dt.tz_localize(None).dt.time
+    
+        display_cols = ['Datetime', 'Time', 'Open', 'High', 'Low', 'Close']
+        if 'Volume' in sample.columns:
+            display_cols.append('Volume')
+        print(sample[display_cols].to_string(index=False))
+    
+        # Group by date and show summary
+        if filtered_data['Datetime'].notna().any():
+            print()
+            print("=" * 80)
+            print("DATA BY DATE (Sample - First 5 days)")
+            print("=" * 80)
         
-        for i, (date, group) in enumerate(filtered_data.groupby('Date')):
-            if i >= 5:
-                break
-            print(f"\n📅 {date} ({pd.Timestamp(date).strftime('%A')}) - {len(group)} data points")
-            print("-" * 80)
-            if 'Time' in group.columns:
-                print(f"{'Time (ET)':<12} {'Open':<10} {'High':<10} {'Low':<10} {'Close':<10}")
+            # Rows are already in time order, so the day groups need no sorting
+            for i, (day, group) in enumerate(filtered_data.groupby(day_int, sort=False)):
+                if i >= 5:
+                    break
+                print(f"\n📅 {day_label(day)} - {len(group)} data points")
+                print("-" * 80)
+                print(table_header(volume=False))
                 print("-" * 80)
-                for _, row in group.head(5).iterrows():
-                    time_str = row['Time'].strftime('%H:%M') if pd.notna(row['Time']) else 'N/A'
-                    print(f"{time_str:<12} ${row['Open']:<9.2f} ${row['High']:<9.2f} "
-                          f"${row['Low']:<9.2f} ${row['Close']:<9.2f}")
+                # Format the shown rows column-wise and print them in one call
+                row_lines = format_bar_rows(group.head(5), 'Datetime', volume=False)
+                print('\n'.join(row_lines.tolist()))
                 if len(group) > 5:
                     print(f"... and {len(group) - 5} more intervals")
-            else:
-                print(f"Open: ${group['Open'].iloc[0]:.2f}, Close: ${group['Close'].iloc[0]:.2f}")
     
     # Save to CSV
     output_file = f"aapl_30min_1year_{end_date.strftime('%Y%m%d')}.csv"
-    filtered_data.to_csv(output_file, index=False)
+    save_csv(
+        filtered_data, output_file, text_columns=('Datetime',),
+        extra_columns=time_date_arrays(filtered_data['Datetime'])
+    )
+    # Typed copy that keeps the timezone-aware Datetime column
+    parquet_file = output_file.replace('.csv', '.parquet')
+    filtered_data.to_parquet(parquet_file, index=False)
     print()
     print(f"✅ Data saved to: {output_file}")
     print(f"   Total rows: {len(filtered_data)}")
+    print(f"✅ Parquet saved to: {parquet_file}")
     
     return filtered_data
 
 
 if __name__ == '__main__':
-    data = fetch_aapl_30min_1year()
+    data = fetch_aapl_30min_1year(verbose='--quiet' not in sys.argv[1:])
     
     if data is not None:
         print()
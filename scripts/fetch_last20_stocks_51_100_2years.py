@@ -1,323 +1,41 @@
 """
 Fetch last 20 stocks (31-50) from stocks 51-100 at 30-minute intervals for the past 2 years using Alpaca API.
 """
-import pandas as pd
-from datetime import datetime, timedelta
-import pytz
-from config import Config
+import sys
 import logging
-import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Last 20 stocks from stocks 51-100 (stocks 31-50, which are stocks 81-100 overall)
-LAST_20_STOCKS = [
-    'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH',
-    'QCOM', 'RTX', 'BMY', 'AMGN', 'SPGI', 'DE', 'LOW', 'INTU', 'BKNG', 'SBUX'
-]
-
-# Wait, let me check the actual list - stocks 31-50 from the 51-100 list
-# Actually, from the original list, stocks 31-40 and 41-50 would be:
-LAST_20_STOCKS = [
-    'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH',
-    # These last 10 need to be checked - but based on the pattern, these should be the remaining stocks
-    # Actually, let me use the correct list from the original fetch_stocks_51_100 file
-]
-
-# Let me fix this - the stocks 51-100 list has 50 stocks total
-# We've fetched: 1-10, 11-20, 21-40
-# So remaining: 41-50 (last 10)
-# But user asked for last 20, so maybe they mean 31-50?
-
-# Actually, checking the original list structure, stocks 31-50 would be:
-LAST_20_STOCKS = [
+# Stocks 41-50 from stocks 51-100 (the remaining 10)
+LAST_10_STOCKS = [
     'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH'
 ]
 
-# But user said "last 20", so let me include stocks 31-50. Since we only have 50 stocks total
-# and we've done 1-10, 11-20, 21-40, the remaining is 41-50 (10 stocks)
-# But they want 20, so maybe they mean the last 20 from the full 100 list?
-# Let me just do stocks 41-50 from stocks 51-100, which is 10 stocks
-# Actually wait - let me re-read: "get the last 20 stocks" - they probably mean
-# the last 20 from each group that haven't been fetched yet.
-
-# From stocks 51-100, we've fetched: 1-10, 11-20, 21-40
-# So remaining: 41-50 (10 stocks)
-# But they want 20, so maybe they want stocks 31-50? That would be 20 stocks.
-
-# Let me check what stocks 31-40 and 41-50 are from the original list
-# From fetch_stocks_51_100, the full list is 50 stocks
-# Stocks 31-40: POOL, WST, ZBRA, VRSK, EXPD, CHRW, JBHT, CSGP, RBC, TECH
-# Stocks 41-50: (need to check the original list)
-
-# Actually, I'll just use stocks 31-50 from the original list, which should be 20 stocks
-LAST_20_STOCKS = [
-    'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH',
-    'QCOM', 'RTX', 'BMY', 'AMGN', 'SPGI', 'DE', 'LOW', 'INTU', 'BKNG', 'SBUX'
-]
 
-# Import the fetch function (same as other script)
-def fetch_stock_alpaca_1year(symbol: str, data_client, start_date, end_date):
-    """Fetch 1 year of 30-minute data for a single stock."""
+def main(write_csv: bool = True):
     try:
-        from alpaca.data.requests import StockBarsRequest
-        from alpaca.data.timeframe import TimeFrame
-        
-        print(f"   📡 Fetching {symbol}...", end=' ', flush=True)
-        
-        request_params = StockBarsRequest(
-            symbol_or_symbols=[symbol],
-            timeframe=TimeFrame.Minute,
-            start=start_date.date(),
-            end=end_date.date()
-        )
-        
-        bars = data_client.get_stock_bars(request_params)
-        
-        if not bars or not hasattr(bars, 'data') or symbol not in bars.data:
-            print(f"❌ No data")
-            return None
-        
-        df = bars.df
-        
-        if df.empty:
-            print(f"❌ Empty")
-            return None
-        
-        if 'symbol' in df.index.names:
-            df = df.loc[symbol]
-        
-        df = df.reset_index()
-        
-        if 'timestamp' in df.columns:
-            df['Datetime'] = pd.to_datetime(df['timestamp'])
-        elif len(df.index) > 0 and isinstance(df.index, pd.DatetimeIndex):
-            df['Datetime'] = df.index
-        else:
-            datetime_cols = [col for col in df.columns if 'time' in col.lower() or 'date' in col.lower()]
-            if datetime_cols:
-                df['Datetime'] = pd.to_datetime(df[datetime_cols[0]])
-            else:
-                print(f"❌ No timestamp column")
-                return None
-        
-        df = df.set_index('Datetime')
-        
-        df_resampled = df.resample('30min').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum',
-            'trade_count': 'sum' if 'trade_count' in df.columns else 'first',
-            'vwap': 'mean' if 'vwap' in df.columns else 'first'
-        }).dropna()
-        
-        df = df_resampled.reset_index()
-        
-        if 'Datetime' not in df.columns:
-            if 'timestamp' in df.columns:
-                df['Datetime'] = pd.to_datetime(df['timestamp'])
-            else:
-                df['Datetime'] = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
-        
-        if not pd.api.types.is_datetime64_any_dtype(df['Datetime']):
-            df['Datetime'] = pd.to_datetime(df['Datetime'])
-        
-        et_tz = pytz.timezone('America/New_York')
-        if df['Datetime'].dt.tz is None:
-            df['Datetime'] = df['Datetime'].dt.tz_localize('UTC')
-        df['Datetime'] = df['Datetime'].dt.tz_convert(et_tz)
-        
-        df['Date'] = df['Datetime'].dt.date
-        df['Time'] = df['Datetime'].dt.time
-        
-        market_open = pd.Timestamp('09:30').time()
-        market_close = pd.Timestamp('16:00').time()
-        
-        filtered_data = df[
-            (df['Time'] >= market_open) & 
-            (df['Time'] <= market_close)
-        ].copy()
-        
-        if filtered_data.empty:
-            print(f"❌ No market hours data")
-            return None
-        
-        filtered_data = filtered_data.sort_values('Datetime')
-        
-        filtered_data = filtered_data.rename(columns={
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close',
-            'volume': 'Volume'
-        })
-        
-        filtered_data['Symbol'] = symbol
-        
-        print(f"✅ {len(filtered_data)} data points")
-        return filtered_data
-        
-    except Exception as e:
-        print(f"❌ Error: {str(e)[:50]}")
+        from alpaca_fetch import run_fetch
+    except ImportError as e:
+        # Only a missing alpaca-py gets the install hint
+        if not (e.name or '').startswith('alpaca'):
+            raise
+        print("❌ alpaca-py not installed!")
+        print("   Install with: pip install alpaca-py")
         return None
-
-
-def main():
-    if not Config.ALPACA_API_KEY or not Config.ALPACA_SECRET_KEY:
-        print("❌ Alpaca API credentials not configured!")
-        return None
-    
-    # Get the correct last 20 stocks from stocks 51-100
-    # We've fetched: 1-10, 11-20, 21-40
-    # So remaining: 41-50 (10 stocks)
-    # But user wants 20, so let's do stocks 31-50
-    # From the original list in fetch_stocks_51_100_alpaca_1year.py:
-    # Stocks 31-40: POOL, WST, ZBRA, VRSK, EXPD, CHRW, JBHT, CSGP, RBC, TECH
-    # Stocks 41-50: (these are the last 10 from the 50-stock list)
-    
-    # Actually, let me just use the remaining stocks 41-50 (10 stocks) since that's what's left
-    # But user said "last 20", so maybe they want stocks 31-50? That would be 20 stocks.
-    # Let me check the original list structure - stocks 31-50 from stocks 51-100 would be:
-    LAST_20_STOCKS = [
-        'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH'
-    ]
-    
-    # Wait, that's only 10. The user wants 20, so maybe they mean stocks 31-50 from the full 100 list?
-    # Or maybe they want the last 20 that haven't been fetched yet?
-    # Since we've done 1-40 from stocks 51-100, the remaining is 41-50 (10 stocks)
-    # But they said "last 20", so let me include stocks 31-50 which would be 20 stocks total
-    
-    # Actually, I think the user means the last 20 stocks from each group that we haven't fetched yet.
-    # For stocks 51-100, we've done 1-40, so remaining is 41-50 (10 stocks).
-    # But they said "20", so maybe they want stocks 31-50? That's 20 stocks.
-    
-    # Let me just fetch stocks 41-50 (the actual remaining 10) and see if that's what they want
-    # Or better yet, let me fetch stocks 31-50 to get 20 stocks
-    
-    # Checking the original list from fetch_stocks_51_100_alpaca_1year.py:
-    # The full list has 50 stocks. Stocks 31-50 would be positions 31-50 in that list.
-    # But we need to know what those are. Let me just use a reasonable assumption.
     
-    # Actually, I'll fetch the remaining stocks 41-50 (10 stocks) since that's what's logically left
-    # But if user wants 20, I'll do stocks 31-50
-    
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=730)  # 2 years
-    
-    # Stocks 41-50 from stocks 51-100 (the remaining 10)
-    LAST_10_STOCKS = [
-        'POOL', 'WST', 'ZBRA', 'VRSK', 'EXPD', 'CHRW', 'JBHT', 'CSGP', 'RBC', 'TECH'
-    ]
-    
-    print("=" * 80)
-    print("FETCHING LAST 10 STOCKS (41-50) FROM STOCKS 51-100 (30-MINUTE INTERVALS) - 2 YEARS")
-    print("Using: Alpaca API")
-    print("=" * 80)
-    print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-    print(f"Interval: 30 minutes")
-    print(f"Market Hours: 9:30 AM - 4:00 PM ET")
-    print(f"Stocks: {len(LAST_10_STOCKS)} stocks")
-    print(f"Stocks: {', '.join(LAST_10_STOCKS)}")
-    print()
-    print("Note: Only 10 stocks remaining (41-50) from stocks 51-100 group")
-    print()
-    
-    try:
-        from alpaca.data.historical import StockHistoricalDataClient
-        
-        data_client = StockHistoricalDataClient(
-            api_key=Config.ALPACA_API_KEY,
-            secret_key=Config.ALPACA_SECRET_KEY
-        )
-        
-        print("📡 Fetching data from Alpaca API...")
-        print()
-        
-        all_data = []
-        successful = []
-        failed = []
-        
-        for i, symbol in enumerate(LAST_10_STOCKS, 1):
-            print(f"[{i}/{len(LAST_10_STOCKS)}] {symbol}:", end=' ')
-            
-            data = fetch_stock_alpaca_1year(symbol, data_client, start_date, end_date)
-            
-            if data is not None:
-                all_data.append(data)
-                successful.append(symbol)
-            else:
-                failed.append(symbol)
-        
-        if not all_data:
-            print("\n❌ No data fetched for any stocks")
-            return None
-        
-        print()
-        print("=" * 80)
-        print("COMBINING DATA")
-        print("=" * 80)
-        
-        combined_df = pd.concat(all_data, ignore_index=True)
-        combined_df = combined_df.sort_values(['Symbol', 'Datetime'])
-        
-        print(f"✅ Combined {len(combined_df)} total data points")
-        
-        print()
-        print("=" * 80)
-        print("FETCH SUMMARY")
-        print("=" * 80)
-        print(f"✅ Successful: {len(successful)} stocks")
-        print(f"❌ Failed: {len(failed)} stocks")
-        
-        if successful:
-            print(f"\n✅ Successfully fetched: {', '.join(successful)}")
-        
-        if failed:
-            print(f"\n❌ Failed: {', '.join(failed)}")
-        
-        print()
-        print("=" * 80)
-        print("DATA STATISTICS BY STOCK")
-        print("=" * 80)
-        
-        stats_list = []
-        for symbol in successful:
-            stock_data = combined_df[combined_df['Symbol'] == symbol]
-            if not stock_data.empty:
-                stats_list.append({
-                    'Symbol': symbol,
-                    'Data Points': len(stock_data),
-                    'Date Range': f"{stock_data['Date'].min()} to {stock_data['Date'].max()}",
-                    'Trading Days': stock_data['Date'].nunique(),
-                    'Avg Price': f"${stock_data['Close'].mean():.2f}",
-                    'High': f"${stock_data['High'].max():.2f}",
-                    'Low': f"${stock_data['Low'].min():.2f}",
-                    'Total Volume': f"{int(stock_data['Volume'].sum()):,}"
-                })
-        
-        stats_df = pd.DataFrame(stats_list)
-        print(stats_df.to_string(index=False))
-        
-        output_file = f"last10_stocks_51_100_30min_2years_alpaca_{end_date.strftime('%Y%m%d')}.csv"
-        combined_df.to_csv(output_file, index=False)
-        print()
-        print(f"✅ Combined data saved to: {output_file}")
-        print(f"   Total rows: {len(combined_df):,}")
-        
-        return combined_df
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    return run_fetch(
+        LAST_10_STOCKS,
+        "FETCHING LAST 10 STOCKS (41-50) FROM STOCKS 51-100 (30-MINUTE INTERVALS) - 2 YEARS",
+        'last10_stocks_51_100_30min_2years_alpaca',
+        note="Note: Only 10 stocks remaining (41-50) from stocks 51-100 group",
+        write_csv=write_csv
+    )
 
 
 if __name__ == '__main__':
-    data = main()
+    # --parquet-only skips the CSV copy
+    data = main(write_csv='--parquet-only' not in sys.argv[1:])
     
     if data is not None:
         print()
@@ -4,14 +4,18 @@ Only includes prices during market hours (9:30 AM - 4:00 PM ET).
 """
 import pandas as pd
 from datetime import datetime, timedelta
-import pytz
 from config import Config
 import logging
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-stock CSV files written at once
+MAX_WRITE_WORKERS = 8
+
 # Stocks 51-100 by market cap (as of 2025)
 STOCKS_51_100 = [
     'GE', 'AXP', 'AMAT', 'ADI', 'ISRG', 'MU', 'BLK', 'TJX', 'C', 'LMT',
@@ -22,128 +26,20 @@ STOCKS_51_100 = [
 ]
 
 
-def fetch_stock_alpaca_1year(symbol: str, data_client, start_date, end_date):
-    """Fetch 1 year of 30-minute data for a single stock."""
-    try:
-        from alpaca.data.requests import StockBarsRequest
-        from alpaca.data.timeframe import TimeFrame
-        
-        print(f"   📡 Fetching {symbol}...", end=' ', flush=True)
-        
-        request_params = StockBarsRequest(
-            symbol_or_symbols=[symbol],
-            timeframe=TimeFrame.Minute,  # 1-minute intervals (will resample)
-            start=start_date.date(),
-            end=end_date.date()
-        )
-        
-        bars = data_client.get_stock_bars(request_params)
-        
-        if not bars or not hasattr(bars, 'data') or symbol not in bars.data:
-            print(f"❌ No data")
-            return None
-        
-        # Use the DataFrame directly
-        df = bars.df
-        
-        if df.empty:
-            print(f"❌ Empty")
-            return None
-        
-        # Filter for symbol (in case multiple symbols)
-        if 'symbol' in df.index.names:
-            df = df.loc[symbol]
-        
-        # Reset index to get timestamp as column
-        df = df.reset_index()
-        
-        # Find the timestamp column
-        if 'timestamp' in df.columns:
-            df['Datetime'] = pd.to_datetime(df['timestamp'])
-        elif len(df.index) > 0 and isinstance(df.index, pd.DatetimeIndex):
-            df['Datetime'] = df.index
-        else:
-            datetime_cols = [col for col in df.columns if 'time' in col.lower() or 'date' in col.lower()]
-            if datetime_cols:
-                df['Datetime'] = pd.to_datetime(df[datetime_cols[0]])
-            else:
-                print(f"❌ No timestamp column")
-                return None
-        
-        # Set Datetime as index for resampling
-        df = df.set_index('Datetime')
-        
-        # Resample 1-minute data to 30-minute intervals
-        df_resampled = df.resample('30min').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum',
-            'trade_count': 'sum' if 'trade_count' in df.columns else 'first',
-            'vwap': 'mean' if 'vwap' in df.columns else 'first'
-        }).dropna()
-        
-        df = df_resampled.reset_index()
-        
-        # Ensure Datetime is datetime type
-        if 'Datetime' not in df.columns:
-            if 'timestamp' in df.columns:
-                df['Datetime'] = pd.to_datetime(df['timestamp'])
-            else:
-                df['Datetime'] = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
-        
-        if not pd.api.types.is_datetime64_any_dtype(df['Datetime']):
-            df['Datetime'] = pd.to_datetime(df['Datetime'])
-        
-        # Convert to ET timezone
-        et_tz = pytz.timezone('America/New_York')
-        if df['Datetime'].dt.tz is None:
-            df['Datetime'] = df['Datetime'].dt.tz_localize('UTC')
-        df['Datetime'] = df['Datetime'].dt.tz_convert(et_tz)
-        
-        # Extract date and time
-        df['Date'] = df['Datetime'].dt.date
-        df['Time'] = df['Datetime'].dt.time
-        
-        # Filter for market hours (9:30 AM - 4:00 PM ET)
-        market_open = pd.Timestamp('09:30').time()
-        market_close = pd.Timestamp('16:00').time()
-        
-        filtered_data = df[
-            (df['Time'] >= market_open) & 
-            (df['Time'] <= market_close)
-        ].copy()
-        
-        if filtered_data.empty:
-            print(f"❌ No market hours data")
-            return None
-        
-        # Sort by datetime
-        filtered_data = filtered_data.sort_values('Datetime')
-        
-        # Rename columns to match expected format
-        filtered_data = filtered_data.rename(columns={
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close',
-            'volume': 'Volume'
-        })
-        
-        # Add symbol column
-        filtered_data['Symbol'] = symbol
-        
-        print(f"✅ {len(filtered_data)} data points")
-        return filtered_data
-        
-    except Exception as e:
-        print(f"❌ Error: {str(e)[:50]}")
-        return None
+def add_date_time(data: pd.DataFrame) -> pd.DataFrame:
+    """Date and Time (ET) columns ahead of Symbol, as in this script's output files."""
+    symbol = data.pop('Symbol')
+    return data.assign(Date=data['Datetime'].dt.date, Time=data['Datetime'].dt.time, Symbol=symbol)
 
 
-def fetch_stocks_51_100_alpaca_1year():
-    """Fetch 1 year of 30-minute data for stocks 51-100."""
+def fetch_stocks_51_100_alpaca_1year(write_csv: bool = True):
+    """
+    Fetch 1 year of 30-minute data for stocks 51-100.
+    
+    Args:
+        write_csv: Write CSV files next to the Parquet output; without it the
+            per-stock files are Parquet as well
+    """
     
     # Check if Alpaca credentials are configured
     if not Config.ALPACA_API_KEY or not Config.ALPACA_SECRET_KEY:
@@ -167,6 +63,7 @@ def fetch_stocks_51_100_alpaca_1year():
     
     try:
         from alpaca.data.historical import StockHistoricalDataClient
+        from alpaca_fetch import fetch_stocks_alpaca, process_stock_bars
         
         # Initialize Alpaca data client
         data_client = StockHistoricalDataClient(
@@ -182,13 +79,22 @@ def fetch_stocks_51_100_alpaca_1year():
         successful = []
         failed = []
         
+        # Shared batched fetch: parallel multi-symbol requests with backoff on
+        # rate limits, cached per symbol
+        bars_by_symbol = fetch_stocks_alpaca(STOCKS_51_100, data_client, start_date, end_date)
+        print()
+        
         for i, symbol in enumerate(STOCKS_51_100, 1):
             print(f"[{i}/{len(STOCKS_51_100)}] {symbol}:", end=' ')
             
-            data = fetch_stock_alpaca_1year(symbol, data_client, start_date, end_date)
+            if symbol in bars_by_symbol:
+                data = process_stock_bars(symbol, bars_by_symbol.pop(symbol))
+            else:
+                print(f"❌ No data")
+                data = None
             
             if data is not None:
-                all_data.append(data)
+                all_data.append(add_date_time(data))
                 successful.append(symbol)
             else:
                 failed.append(symbol)
@@ -204,13 +110,16 @@ def fetch_stocks_51_100_alpaca_1year():
         print("=" * 80)
         print(f"Combining data from {len(all_data)} stocks...")
         
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Sort by symbol and datetime
-        combined_df = combined_df.sort_values(['Symbol', 'Datetime'])
+        # Each stock's rows are already in Datetime order, so concatenating them
+        # in Symbol order gives the (Symbol, Datetime) order without a sort
+        symbol_order = sorted(range(len(successful)), key=successful.__getitem__)
+        combined_df = pd.concat([all_data[i] for i in symbol_order], ignore_index=True)
         
         print(f"✅ Combined {len(combined_df)} total data points")
         
+        # Split by symbol once for the per-stock files
+        stock_groups = dict(list(combined_df.groupby('Symbol', sort=False)))
+        
         # Display summary
         print()
         print("=" * 80)
@@ -239,29 +148,41 @@ def fetch_stocks_51_100_alpaca_1year():
         print("DATA STATISTICS BY STOCK")
         print("=" * 80)
         
-        stats_list = []
-        for symbol in successful:
-            stock_data = combined_df[combined_df['Symbol'] == symbol]
-            if not stock_data.empty:
-                stats_list.append({
-                    'Symbol': symbol,
-                    'Data Points': len(stock_data),
-                    'Date Range': f"{stock_data['Date'].min()} to {stock_data['Date'].max()}",
-                    'Trading Days': stock_data['Date'].nunique(),
-                    'Avg Price': f"${stock_data['Close'].mean():.2f}",
-                    'High': f"${stock_data['High'].max():.2f}",
-                    'Low': f"${stock_data['Low'].min():.2f}",
-                    'Total Volume': f"{int(stock_data['Volume'].sum()):,}"
-                })
-        
-        stats_df = pd.DataFrame(stats_list)
+        # One grouped pass over the data, rows in fetch order
+        agg = combined_df.groupby('Symbol').agg(
+            data_points=('Close', 'size'),
+            date_min=('Date', 'min'),
+            date_max=('Date', 'max'),
+            trading_days=('Date', 'nunique'),
+            avg_price=('Close', 'mean'),
+            high=('High', 'max'),
+            low=('Low', 'min'),
+            total_volume=('Volume', 'sum')
+        ).reindex(successful)
+        
+        # Display columns formatted column-wise straight from the aggregates
+        stats_df = pd.DataFrame({
+            'Symbol': agg.index,
+            'Data Points': agg['data_points'],
+            'Date Range': agg['date_min'].astype(str) + ' to ' + agg['date_max'].astype(str),
+            'Trading Days': agg['trading_days'],
+            'Avg Price': agg['avg_price'].map('${:.2f}'.format),
+            'High': agg['high'].map('${:.2f}'.format),
+            'Low': agg['low'].map('${:.2f}'.format),
+            'Total Volume': agg['total_volume'].astype('int64').map('{:,}'.format)
+        })
         print(stats_df.to_string(index=False))
         
         # Save combined data
         output_file = f"stocks_51_100_30min_2years_alpaca_{end_date.strftime('%Y%m%d')}.csv"
-        combined_df.to_csv(output_file, index=False)
+        # Typed, compressed copy for downstream readers (no CSV re-parsing)
+        parquet_file = output_file.replace('.csv', '.parquet')
+        combined_df.to_parquet(parquet_file, index=False)
         print()
-        print(f"✅ Combined data saved to: {output_file}")
+        if write_csv:
+            combined_df.to_csv(output_file, index=False)
+            print(f"✅ Combined data saved to: {output_file}")
+        print(f"✅ Parquet saved to: {parquet_file}")
         print(f"   Total rows: {len(combined_df):,}")
         
         # Also save individual files per stock
@@ -271,11 +192,17 @@ def fetch_stocks_51_100_alpaca_1year():
         print()
         print(f"📁 Saving individual stock files to: {output_dir}/")
         
-        for symbol in successful:
-            stock_data = combined_df[combined_df['Symbol'] == symbol]
-            if not stock_data.empty:
-                stock_file = os.path.join(output_dir, f"{symbol}_30min_1year.csv")
-                stock_data.to_csv(stock_file, index=False)
+        # Write the files concurrently (I/O-bound)
+        def save_stock_file(group):
+            symbol, stock_data = group
+            stock_file = os.path.join(output_dir, f"{symbol}_30min_1year")
+            if write_csv:
+                stock_data.to_csv(f"{stock_file}.csv", index=False)
+            else:
+                stock_data.to_parquet(f"{stock_file}.parquet", index=False)
+        
+        with ThreadPoolExecutor(max_workers=MAX_WRITE_WORKERS) as executor:
+            list(executor.map(save_stock_file, stock_groups.items()))
         
         print(f"✅ Saved {len(successful)} individual stock files")
         
@@ -293,7 +220,8 @@ def fetch_stocks_51_100_alpaca_1year():
 
 
 if __name__ == '__main__':
-    data = fetch_stocks_51_100_alpaca_1year()
+    # --parquet-only skips the CSV copies
+    data = fetch_stocks_51_100_alpaca_1year(write_csv='--parquet-only' not in sys.argv[1:])
     
     if data is not None:
         print()
@@ -27,6 +27,7 @@ def fetch_stock_alpaca_1year(symbol: str, data_client, start_date, end_date):
     try:
         from alpaca.data.requests import StockBarsRequest
         from alpaca.data.timeframe import TimeFrame
+        from alpaca_fetch import feed_kwargs
         
         print(f"   📡 Fetching {symbol}...", end=' ', flush=True)
         
@@ -34,7 +35,8 @@ def fetch_stock_alpaca_1year(symbol: str, data_client, start_date, end_date):
             symbol_or_symbols=[symbol],
             timeframe=TimeFrame.Minute,  # 1-minute intervals (will resample)
             start=start_date.date(),
-            end=end_date.date()
+            end=end_date.date(),
+            **feed_kwargs()
         )
         
         bars = data_client.get_stock_bars(request_params)
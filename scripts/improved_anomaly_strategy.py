@@ -80,9 +80,21 @@ class ImprovedAnomalyTradingStrategy:
         
         # Track performance for dynamic position sizing
         self.stock_performance = {}  # Track win/loss for each stock
+        
+        # Optional pre-fetched daily bars (symbol -> DataFrame) covering start/end dates
+        self.price_data: Dict[str, pd.DataFrame] = {}
     
     def fetch_stock_data(self, symbol: str) -> pd.DataFrame:
-        """Fetch historical stock data."""
+        """Fetch historical stock data (sliced from price_data when pre-fetched)."""
+        if symbol in self.price_data:
+            data = self.price_data[symbol]
+            if data.empty:
+                return data
+            # Same window as the yfinance request: start inclusive, end exclusive
+            dates = data['Date'].dt.tz_localize(None) if data['Date'].dt.tz is not None else data['Date']
+            mask = (dates >= pd.Timestamp(self.start_date)) & (dates < pd.Timestamp(self.end_date))
+            return data[mask].reset_index(drop=True)
+        
         try:
             ticker = yf.Ticker(symbol)
             data = ticker.history(start=self.start_date, end=self.end_date, interval='1d')
@@ -243,9 +255,18 @@ class ImprovedAnomalyTradingStrategy:
         
         self.stock_performance[symbol]['total_profit'] += profit
     
-    def backtest_strategy(self, symbol: str) -> Dict:
-        """Backtest improved anomaly detection strategy for a stock."""
-        data = self.fetch_stock_data(symbol)
+    def backtest_strategy(self, symbol: str, data: Optional[pd.DataFrame] = None,
+                          scores: Optional[Tuple[np.ndarray, ...]] = None) -> Dict:
+        """
+        Backtest improved anomaly detection strategy for a stock.
+        
+        Args:
+            symbol: Stock symbol
+            data: Already-fetched daily bars (fetched here if None)
+            scores: Precomputed AnomalyDetector scores for data (computed here if None)
+        """
+        if data is None:
+            data = self.fetch_stock_data(symbol)
         if data.empty or len(data) < 30:
             return {
                 'symbol': symbol,
@@ -281,6 +302,10 @@ class ImprovedAnomalyTradingStrategy:
             if backtest_end.tz is not None:
                 backtest_end = backtest_end.tz_localize(None)
         
+        # Anomaly statistics for every bar, computed once up front
+        if scores is None:
+            scores = self.detector.score_bars(data)
+        
         # Start after lookback period
         for i in range(self.detector.lookback_period, len(data)):
             current_date = data.iloc[i]['Date']
@@ -407,7 +432,7 @@ class ImprovedAnomalyTradingStrategy:
                 positions.remove(pos)
             
             # Detect anomalies
-            anomaly_info = self.detector.detect_all_anomalies(data, i)
+            anomaly_info = self.detector.detect_all_anomalies(data, i, scores=scores)
             
             if anomaly_info['is_anomaly']:
                 anomalies_detected += 1
@@ -586,9 +611,15 @@ class ImprovedAnomalyTradingStrategy:
         total_trailing_stops = 0
         total_overbought_sells = 0
         
-        for symbol in self.stocks:
-            symbol = symbol.strip().upper()
-            result = self.backtest_strategy(symbol)
+        # Fetch everything first so all symbols are scored in one parallel kernel call
+        symbols = [symbol.strip().upper() for symbol in self.stocks]
+        data_by_symbol = {symbol: self.fetch_stock_data(symbol) for symbol in symbols}
+        scores_by_symbol = self.detector.score_symbols(
+            {symbol: data for symbol, data in data_by_symbol.items() if len(data) >= 30}
+        )
+        
+        for symbol in symbols:
+            result = self.backtest_strategy(symbol, data_by_symbol[symbol], scores_by_symbol.get(symbol))
             results[symbol] = result
             
             total_invested_all += result['total_invested']
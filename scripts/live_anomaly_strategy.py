@@ -5,6 +5,7 @@ Real-time version of the improved anomaly strategy for live trading
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
@@ -56,8 +57,8 @@ class LiveAnomalyDetector:
         
         # Log price check to Supabase
         try:
-            from supabase_logger import log_price_check
-            log_price_check(
+            from supabase_logger import queue_price_check
+            queue_price_check(
                 symbol=symbol,
                 price=current_price,
                 context='signal_check',
@@ -164,6 +165,34 @@ class LivePositionTracker:
         self.positions = {}  # symbol -> List of Position info (allows multiple positions per symbol)
         self.stop_loss_pct = stop_loss_pct
         self.trailing_stop_pct = trailing_stop_pct
+        # Per-symbol price band where update_position is a no-op:
+        # (highest stop price across positions, lowest highest_price across positions)
+        self._thresholds: Dict[str, Tuple[float, float]] = {}
+        # Running per-symbol aggregates, maintained on add/remove
+        self._shares_sum: Dict[str, float] = defaultdict(float)
+        self._count: Dict[str, int] = defaultdict(int)
+    
+    def _refresh_thresholds(self, symbol: str):
+        """Recompute the no-op price band for a symbol after its positions change."""
+        positions = self.positions.get(symbol)
+        if not positions:
+            self._thresholds.pop(symbol, None)
+            return
+        sell_trigger = max(max(p['stop_loss_price'], p['trailing_stop_price']) for p in positions)
+        lowest_high = min(p['highest_price'] for p in positions)
+        self._thresholds[symbol] = (sell_trigger, lowest_high)
+    
+    def needs_update(self, symbol: str, current_price: float) -> bool:
+        """
+        Check whether current_price can change any position for a symbol.
+        
+        False when the price is above every stop and not above any position's
+        highest price, i.e. update_position would neither ratchet nor trigger.
+        """
+        if symbol not in self._thresholds:
+            return False
+        sell_trigger, lowest_high = self._thresholds[symbol]
+        return current_price <= sell_trigger or current_price > lowest_high
     
     def add_position(self, symbol: str, shares: float, entry_price: float):
         """Add a new position (can have multiple positions per symbol)."""
@@ -178,6 +207,9 @@ class LivePositionTracker:
             'stop_loss_price': entry_price * (1 - self.stop_loss_pct),
             'trailing_stop_price': entry_price * (1 - self.trailing_stop_pct)
         })
+        self._shares_sum[symbol] += shares
+        self._count[symbol] += 1
+        self._refresh_thresholds(symbol)
     
     def update_position(self, symbol: str, current_price: float) -> Tuple[bool, Optional[str], Optional[Dict]]:
         """
@@ -190,6 +222,7 @@ class LivePositionTracker:
             return False, None, None
         
         # Check each position independently
+        result = (False, None, None)
         for pos in self.positions[symbol]:
             # Update highest price for trailing stop
             if current_price > pos['highest_price']:
@@ -198,13 +231,16 @@ class LivePositionTracker:
             
             # Check stop-loss first (more urgent)
             if current_price <= pos['stop_loss_price']:
-                return True, 'STOP_LOSS', pos
+                result = (True, 'STOP_LOSS', pos)
+                break
             
             # Check trailing stop
             if current_price <= pos['trailing_stop_price']:
-                return True, 'TRAILING_STOP', pos
+                result = (True, 'TRAILING_STOP', pos)
+                break
         
-        return False, None, None
+        self._refresh_thresholds(symbol)
+        return result
     
     def remove_position(self, symbol: str, position_to_remove: Optional[Dict] = None):
         """Remove a position. If position_to_remove is None, removes all positions for symbol."""
@@ -218,10 +254,18 @@ class LivePositionTracker:
             # Remove specific position
             if position_to_remove in self.positions[symbol]:
                 self.positions[symbol].remove(position_to_remove)
+                self._shares_sum[symbol] -= position_to_remove['shares']
+                self._count[symbol] -= 1
             
             # Clean up empty lists
             if len(self.positions[symbol]) == 0:
                 del self.positions[symbol]
+        
+        if symbol not in self.positions:
+            self._shares_sum.pop(symbol, None)
+            self._count.pop(symbol, None)
+        
+        self._refresh_thresholds(symbol)
     
     def get_position(self, symbol: str) -> Optional[Dict]:
         """Get first position info for a symbol (for backward compatibility)."""
@@ -241,19 +285,26 @@ class LivePositionTracker:
         """Get all positions (symbol -> list of positions)."""
         return {symbol: positions.copy() for symbol, positions in self.positions.items()}
     
+    def total_shares(self, symbol: str) -> float:
+        """Get total shares across all positions for a symbol (O(1))."""
+        return self._shares_sum.get(symbol, 0.0)
+    
+    def position_count(self, symbol: str) -> int:
+        """Get number of open positions for a symbol (O(1))."""
+        return self._count.get(symbol, 0)
+    
     def get_total_shares(self, symbol: str) -> float:
         """Get total shares across all positions for a symbol."""
-        if symbol not in self.positions:
-            return 0.0
-        return sum(pos['shares'] for pos in self.positions[symbol])
+        return self.total_shares(symbol)
 
 
 class LiveAnomalyStrategy:
     """Live trading version of improved anomaly strategy."""
     
     def __init__(self, min_severity: float = 1.0, stop_loss_pct: float = 0.05,
-                 trailing_stop_pct: float = 0.05):
+                 trailing_stop_pct: float = 0.05, quote_provider=None):
         self.min_severity = min_severity
+        self.quote_provider = quote_provider  # Optional QuoteProvider for latest prices
         self.detector = LiveAnomalyDetector()
         self.position_tracker = LivePositionTracker(stop_loss_pct, trailing_stop_pct)
         self.stock_performance = {}  # For dynamic position sizing
@@ -292,19 +343,35 @@ class LiveAnomalyStrategy:
         else:
             self.stock_performance[symbol]['losses'] += 1
     
-    def check_signals(self, symbol: str) -> Dict:
+    def _get_latest_price(self, symbol: str) -> Optional[float]:
+        """Get the latest price from the quote provider, falling back to daily history."""
+        if self.quote_provider is not None:
+            quote = self.quote_provider.snapshot([symbol]).get(symbol)
+            if quote:
+                return quote['price']
+        
+        data = self.detector.fetch_recent_data(symbol, days=1)
+        if data.empty:
+            return None
+        return data.iloc[-1]['Close']
+    
+    def check_signals(self, symbol: str, current_price: Optional[float] = None) -> Dict:
         """
         Check for trading signals for a symbol.
         
+        Args:
+            symbol: Stock symbol
+            current_price: Pre-fetched latest price for the stop check (fetched if None)
+        
         Returns:
             Dict with 'action' ('BUY', 'SELL', 'HOLD'), 'reason', 'severity', etc.
         """
         # Check existing positions for stop-loss/trailing stop
         if self.position_tracker.has_position(symbol):
             # Get current price
-            data = self.detector.fetch_recent_data(symbol, days=1)
-            if not data.empty:
-                current_price = data.iloc[-1]['Close']
+            if current_price is None:
+                current_price = self._get_latest_price(symbol)
+            if current_price is not None:
                 should_sell, reason, position_to_sell = self.position_tracker.update_position(symbol, current_price)
                 if should_sell:
                     return {
@@ -0,0 +1,194 @@
+"""
+Bulk-load combined-CSV rows into stock_ohlc_30min with Postgres COPY.
+Used by the upload scripts when a direct Postgres URL is configured, instead of
+building INSERT statements for MCP execute_sql. With asyncpg the rows are split
+into chunks copied concurrently through a connection pool; otherwise psycopg2
+copies them in one transaction. Where COPY can't be used, insert_rows() sends
+parameterized multi-row INSERTs with psycopg2's execute_values instead.
+"""
+import asyncio
+import io
+import random
+import time
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    psycopg2 = None
+
+from execute_all_batches import (
+    CREATE_STAGING_SQL, INSERT_FROM_STAGING_SQL, MAX_CONCURRENT_BATCHES, get_database_url
+)
+
+COPY_CHUNK_ROWS = 50_000
+
+# Transient failures are retried with jittered exponential backoff; there is no
+# fixed pause between chunks
+COPY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.1  # seconds, doubled after each failed attempt
+RETRY_MAX_DELAY = 8.0
+RETRYABLE_SQLSTATES = {'57P03', '53300'}  # cannot_connect_now, too_many_connections
+
+INSERT_VALUES_SQL = (
+    "INSERT INTO stock_ohlc_30min (symbol, datetime, date, time, open, high, low, close, volume, trade_count, vwap) "
+    "VALUES %s ON CONFLICT (symbol, datetime) DO NOTHING"
+)
+INSERT_VALUES_TEMPLATE = "(%s, %s, %s::date, %s::time, %s, %s, %s, %s, %s, %s, %s)"
+
+
+def copy_dsn():
+    """Postgres URL to COPY into, or None without a driver or a configured URL."""
+    if asyncpg is None and psycopg2 is None:
+        return None
+    return get_database_url()
+
+
+def insert_dsn():
+    """Postgres URL for insert_rows(), or None without psycopg2 or a configured URL."""
+    if psycopg2 is None:
+        return None
+    return get_database_url()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Server not accepting connections yet, out of connection slots, or a dropped connection."""
+    code = getattr(error, 'sqlstate', None) or getattr(error, 'pgcode', None)
+    return code in RETRYABLE_SQLSTATES or isinstance(error, OSError)
+
+
+def _retry_delay(attempt: int) -> float:
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * (0.5 + random.random())
+
+
+def _csv_text(frame) -> str:
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    return buffer.getvalue()
+
+
+def _insert_rows(frame) -> list:
+    """Row tuples in INSERT_VALUES_SQL column order, with NaN as NULL."""
+    def column(name, cast):
+        if name not in frame.columns:
+            return [None] * len(frame)
+        return [None if value != value else cast(value) for value in frame[name].tolist()]
+    
+    return list(zip(
+        frame['Symbol'].astype(str).str.upper().tolist(),
+        list(frame['Datetime'].dt.to_pydatetime()),
+        frame['Date'].astype(str).tolist(),
+        frame['Time'].astype(str).tolist(),
+        column('Open', float), column('High', float), column('Low', float), column('Close', float),
+        column('Volume', int), column('trade_count', int), column('vwap', float)
+    ))
+
+
+async def _copy_chunks(dsn: str, chunks, columns) -> int:
+    """COPY each chunk in its own transaction, MAX_CONCURRENT_BATCHES at a time."""
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=MAX_CONCURRENT_BATCHES)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    
+    async def copy_chunk(chunk):
+        data = _csv_text(chunk).encode()
+        for attempt in range(COPY_ATTEMPTS):
+            try:
+                async with semaphore, pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute(CREATE_STAGING_SQL)
+                        await conn.copy_to_table(
+                            'stock_ohlc_30min_staging', source=io.BytesIO(data), columns=columns, format='csv'
+                        )
+                        status = await conn.execute(INSERT_FROM_STAGING_SQL)
+                # Status is "INSERT 0 <rows>"
+                return int(status.split()[-1])
+            except Exception as e:
+                if attempt == COPY_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                await asyncio.sleep(_retry_delay(attempt))
+    
+    try:
+        return sum(await asyncio.gather(*(copy_chunk(chunk) for chunk in chunks)))
+    finally:
+        await pool.close()
+
+
+def _copy_psycopg2(dsn: str, frame, columns) -> int:
+    """COPY the whole frame in one transaction."""
+    text = _csv_text(frame)
+    for attempt in range(COPY_ATTEMPTS):
+        try:
+            conn = psycopg2.connect(dsn)
+            try:
+                with conn, conn.cursor() as cur:
+                    cur.execute(CREATE_STAGING_SQL)
+                    cur.copy_expert(
+                        f"COPY stock_ohlc_30min_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                        io.StringIO(text)
+                    )
+                    cur.execute(INSERT_FROM_STAGING_SQL)
+                    return cur.rowcount
+            finally:
+                conn.close()
+        except Exception as e:
+            if attempt == COPY_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            time.sleep(_retry_delay(attempt))
+
+
+def copy_rows(dsn: str, frame) -> bool:
+    """
+    COPY a frame with the combined CSV's columns into stock_ohlc_30min.
+    
+    The rows land in a temp staging table and are moved over with
+    INSERT ... ON CONFLICT (symbol, datetime) DO NOTHING.
+    """
+    columns = [name.strip().lower() for name in frame.columns]
+    
+    try:
+        if asyncpg is not None:
+            chunks = [frame.iloc[i:i + COPY_CHUNK_ROWS] for i in range(0, len(frame), COPY_CHUNK_ROWS)]
+            print(f"🚀 Loading {len(frame):,} rows with COPY "
+                  f"({len(chunks)} chunks, {MAX_CONCURRENT_BATCHES} concurrent connections)...")
+            inserted = asyncio.run(_copy_chunks(dsn, chunks, columns))
+        else:
+            print(f"🚀 Loading {len(frame):,} rows with COPY...")
+            inserted = _copy_psycopg2(dsn, frame, columns)
+    except Exception as e:
+        print(f"❌ COPY failed: {e}")
+        return False
+    
+    print(f"✅ Inserted {inserted:,} rows (existing rows skipped)")
+    return True
+
+
+def insert_rows(dsn: str, frame, page_size: int = 500) -> bool:
+    """
+    INSERT a frame with the combined CSV's columns (Datetime parsed) into
+    stock_ohlc_30min, page_size rows per statement, in one transaction.
+    """
+    rows = _insert_rows(frame)
+    print(f"🚀 Inserting {len(rows):,} rows with execute_values ({page_size} rows per statement)...")
+    
+    for attempt in range(COPY_ATTEMPTS):
+        try:
+            conn = psycopg2.connect(dsn)
+            try:
+                with conn, conn.cursor() as cur:
+                    execute_values(cur, INSERT_VALUES_SQL, rows, template=INSERT_VALUES_TEMPLATE, page_size=page_size)
+            finally:
+                conn.close()
+            break
+        except Exception as e:
+            if attempt == COPY_ATTEMPTS - 1 or not _is_retryable(e):
+                print(f"❌ INSERT failed: {e}")
+                return False
+            time.sleep(_retry_delay(attempt))
+    
+    print(f"✅ Sent {len(rows):,} rows (existing rows skipped)")
+    return True
@@ -0,0 +1,128 @@
+"""
+Quote provider module for real-time price snapshots.
+Fetches the latest price for many symbols in a single request.
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import requests
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteProvider(ABC):
+    """Abstract interface for batched latest-price lookups."""
+
+    @abstractmethod
+    def snapshot(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Get the latest quote for each symbol.
+
+        Args:
+            symbols: Stock symbols to look up
+
+        Returns:
+            Dict of symbol -> {'price': float, 'volume': Optional[float]}.
+            Symbols without data are omitted.
+        """
+        pass
+
+
+class PolygonQuoteProvider(QuoteProvider):
+    """Latest quotes from Polygon's all-tickers snapshot endpoint (one HTTP call per snapshot)."""
+
+    SNAPSHOT_URL = 'https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers'
+
+    def __init__(self, api_key: str, timeout: float = 10.0):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def snapshot(self, symbols: List[str]) -> Dict[str, Dict]:
+        if not symbols:
+            return {}
+
+        try:
+            response = self.session.get(
+                self.SNAPSHOT_URL,
+                params={'tickers': ','.join(symbols), 'apiKey': self.api_key},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            tickers = response.json().get('tickers') or []
+        except Exception as e:
+            logger.error(f"Error fetching Polygon snapshot: {e}")
+            return {}
+
+        quotes = {}
+        for item in tickers:
+            # Prefer the last trade, then the latest minute bar, then the day bar
+            last_trade = item.get('lastTrade') or {}
+            minute_bar = item.get('min') or {}
+            day_bar = item.get('day') or {}
+            price = last_trade.get('p') or minute_bar.get('c') or day_bar.get('c')
+            if not price:
+                continue
+            volume = minute_bar.get('v')
+            quotes[item['ticker']] = {
+                'price': float(price),
+                'volume': float(volume) if volume is not None else None
+            }
+        return quotes
+
+
+class YFinanceQuoteProvider(QuoteProvider):
+    """Latest 1-minute close from yfinance, downloaded for all symbols in one batch."""
+
+    def snapshot(self, symbols: List[str]) -> Dict[str, Dict]:
+        if not symbols:
+            return {}
+
+        try:
+            import yfinance as yf
+            import pandas as pd
+            data = yf.download(
+                tickers=symbols,
+                period='1d',
+                interval='1m',
+                group_by='ticker',
+                progress=False,
+                threads=True
+            )
+        except Exception as e:
+            logger.error(f"Error fetching yfinance snapshot: {e}")
+            return {}
+
+        if data.empty:
+            return {}
+
+        quotes = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+
+            frame = frame.dropna(subset=['Close'])
+            if frame.empty:
+                continue
+
+            last = frame.iloc[-1]
+            quotes[symbol] = {
+                'price': float(last['Close']),
+                'volume': float(last['Volume']) if 'Volume' in frame.columns else None
+            }
+        return quotes
+
+
+def get_quote_provider(api_key: Optional[str] = None) -> QuoteProvider:
+    """Get the Polygon provider when an API key is configured, otherwise yfinance."""
+    api_key = api_key if api_key is not None else Config.POLYGON_API_KEY
+    if api_key:
+        logger.info("Using Polygon snapshot quotes")
+        return PolygonQuoteProvider(api_key)
+    logger.info("POLYGON_API_KEY not set. Using batched yfinance quotes.")
+    return YFinanceQuoteProvider()
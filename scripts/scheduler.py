@@ -2,17 +2,34 @@
 Scheduler module to execute trades using Improved Anomaly Buy+Sell Strategy.
 """
 import schedule
-import time
 import logging
-from datetime import datetime, timedelta
+import asyncio
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import numpy as np
 import pytz
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from config import Config
 from trader import Trader
 from live_anomaly_strategy import LiveAnomalyStrategy, LivePositionTracker
+from quote_provider import get_quote_provider
 
 logger = logging.getLogger(__name__)
 
+_SEP = "=" * 60
+
+# uvloop for the tick event loop when available (not supported on Windows); it is
+# only used by run(), so importing this module leaves the global loop policy alone
+uvloop = None
+if sys.platform != 'win32':
+    try:
+        import uvloop
+    except ImportError:
+        pass
+
 
 class TradingScheduler:
     """Schedules and executes trading logic using Improved Anomaly Buy+Sell Strategy."""
@@ -20,17 +37,31 @@ class TradingScheduler:
     def __init__(self):
         self.trader = Trader()
         self.stocks = Config.STOCKS
+        self._normalized_stocks = tuple(s.strip().upper() for s in self.stocks if s and s.strip())
         self.trade_time = Config.TRADE_TIME
         self.timezone = pytz.timezone(Config.TIMEZONE)
         self.position_size = Config.POSITION_SIZE
+        self._cached_next_open: Optional[Tuple[date, datetime]] = None
+        
+        # Batched latest-price source (Polygon snapshot if configured, else yfinance)
+        self.quote_provider = get_quote_provider()
         
         # Initialize improved anomaly strategy
         self.strategy = LiveAnomalyStrategy(
             min_severity=1.0,
             stop_loss_pct=0.05,
-            trailing_stop_pct=0.05
+            trailing_stop_pct=0.05,
+            quote_provider=self.quote_provider
         )
         
+        # Signal checks and position monitoring run concurrently each tick;
+        # order submission and position bookkeeping are serialized by the lock
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tick')
+        self._order_lock = threading.Lock()
+        
+        # Set by SIGINT/SIGTERM (or stop()) to wake the run loop immediately
+        self._stop = threading.Event()
+        
         logger.info("Improved Anomaly Buy+Sell Strategy initialized")
         logger.info(f"Stop-Loss: 5%, Trailing Stop: 5%, Min Severity: 1.0")
         
@@ -46,8 +77,12 @@ class TradingScheduler:
         return is_weekday and market_open <= now <= market_close
     
     def _get_next_market_open(self) -> datetime:
-        """Calculate the next market open time."""
+        """Calculate the next market open time (memoized until the date changes or it passes)."""
         now = datetime.now(self.timezone)
+        cached = self._cached_next_open
+        if cached and cached[0] == now.date() and now < cached[1]:
+            return cached[1]
+        
         today_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
         
         # If market already opened today, check tomorrow
@@ -63,32 +98,48 @@ class TradingScheduler:
             next_open = today_open
         else:
             # Market is currently open, return current time (shouldn't happen in this context)
-            next_open = now
+            return now
         
+        self._cached_next_open = (now.date(), next_open)
         return next_open
     
+    def stop(self):
+        """Request the run loop to exit at its next wait."""
+        self._stop.set()
+    
+    def _install_signal_handlers(self):
+        """Stop on SIGINT/SIGTERM (only possible from the main thread)."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self._stop.set())
+    
     def run(self):
         """Start the scheduler and run continuously."""
+        self._install_signal_handlers()
+        
         logger.info(f"Starting trading bot scheduler")
-        logger.info(f"Monitoring stocks: {', '.join(self.stocks)}")
+        logger.info(f"Monitoring stocks: {', '.join(self._normalized_stocks)}")
         logger.info(f"Checking frequency: Every minute during market hours (9:30 AM - 4:00 PM ET)")
         logger.info(f"Position monitoring: Every minute (integrated with signal checks)")
         
         logger.info("Scheduler started. Checking for anomalies and monitoring positions every minute during market hours...")
         
+        # One event loop for all ticks
+        runner = asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None)
+        
         # Run scheduler - optimized to only check during market hours
         try:
-            while True:
+            while not self._stop.is_set():
                 # Check if it's market hours
                 if self._is_market_hours():
-                    # Execute trading logic every minute during market hours
-                    # This now also checks positions (better risk management)
-                    self._execute_trading_logic()
-                    # Also check positions separately for positions not in watchlist
-                    self._monitor_positions()
+                    # Execute trading logic and monitor positions (including those
+                    # not in watchlist) concurrently every minute during market hours
+                    runner.run(self._tick())
                     
                     # Sleep for 1 minute during market hours
-                    time.sleep(60)
+                    if self._stop.wait(60):
+                        break
                 else:
                     # Outside market hours - sleep until next market open
                     next_open = self._get_next_market_open()
@@ -98,175 +149,265 @@ class TradingScheduler:
                     if sleep_seconds > 0:
                         logger.info(f"⏸️  Market closed. Next market open: {next_open.strftime('%Y-%m-%d %H:%M:%S %Z')}")
                         logger.info(f"   Sleeping for {sleep_seconds/3600:.1f} hours until market opens...")
-                        time.sleep(min(sleep_seconds, 3600))  # Sleep max 1 hour at a time to check for market hours
+                        if self._stop.wait(timeout=sleep_seconds):
+                            break
                     else:
                         # Shouldn't happen, but fallback to 1 minute
-                        time.sleep(60)
+                        if self._stop.wait(60):
+                            break
+            logger.info("Scheduler stopped")
         except KeyboardInterrupt:
             logger.info("Scheduler stopped by user")
+        finally:
+            runner.close()
+            self._executor.shutdown(wait=False)
     
-    def _execute_trading_logic(self):
-        """Execute the main trading logic using Improved Anomaly Strategy."""
+    async def _tick(self):
+        """
+        Run one minute cycle.
+        
+        Latest prices for the watchlist and all held symbols are fetched in one
+        snapshot, then signal checks and position monitoring run concurrently on it.
+        """
+        loop = asyncio.get_running_loop()
+        held_symbols = self.strategy.position_tracker.get_all_positions().keys()
+        active_symbols = sorted(set(self._normalized_stocks) | set(held_symbols))
+        try:
+            quotes = await loop.run_in_executor(self._executor, self.quote_provider.snapshot, active_symbols)
+        except Exception as e:
+            logger.error(f"Error fetching quotes: {e}")
+            quotes = {}
+        
+        results = await asyncio.gather(
+            self._execute_trading_logic_async(quotes),
+            self._monitor_positions_async(quotes),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error during trading cycle: {result}")
+    
+    async def _execute_trading_logic_async(self, quotes: Dict[str, Dict]):
+        """Run the blocking trading logic on the shared executor."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._execute_trading_logic, quotes)
+    
+    async def _monitor_positions_async(self, quotes: Dict[str, Dict]):
+        """Run the blocking position monitor on the shared executor."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._monitor_positions, quotes)
+    
+    def _execute_trading_logic(self, quotes: Optional[Dict[str, Dict]] = None):
+        """
+        Execute the main trading logic using Improved Anomaly Strategy.
+        
+        Args:
+            quotes: Pre-fetched latest quotes (symbol -> quote); watchlist symbols
+                with a position use them for their stop-loss/trailing stop check
+        """
+        quotes = quotes or {}
         # Only log when there's actual activity to reduce verbosity
         has_activity = False
         
-        for symbol in self.stocks:
-            symbol = symbol.strip().upper()
-            if not symbol:
-                continue
-            
+        # One timestamp per cycle so all log lines of this tick correlate
+        now_str = datetime.now(self.timezone).strftime('%H:%M:%S')
+        bought_symbols: List[str] = []
+        
+        for symbol in self._normalized_stocks:
             # Check for trading signals
-            signal = self.strategy.check_signals(symbol)
+            quote = quotes.get(symbol)
+            signal = self.strategy.check_signals(symbol, current_price=quote['price'] if quote else None)
             
             if signal['action'] == 'BUY':
                 has_activity = True
-                logger.info("=" * 60)
-                logger.info(f"🕐 {datetime.now(self.timezone).strftime('%H:%M:%S')} - BUY SIGNAL detected")
-                logger.info("=" * 60)
-                logger.info(f"🟢 BUY SIGNAL detected for {symbol}")
-                logger.info(f"   Reason: {signal.get('reason', 'Anomaly detected')}")
-                logger.info(f"   Severity: {signal.get('severity', 0):.2f}")
-                logger.info(f"   Anomaly Types: {', '.join(signal.get('anomaly_types', []))}")
+                logger.info(_SEP)
+                logger.info("🕐 %s - BUY SIGNAL detected", now_str)
+                logger.info(_SEP)
+                logger.info("🟢 BUY SIGNAL detected for %s", symbol)
+                logger.info("   Reason: %s", signal.get('reason', 'Anomaly detected'))
+                logger.info("   Severity: %.2f", signal.get('severity', 0))
+                logger.info("   Anomaly Types: %s", ', '.join(signal.get('anomaly_types', [])))
                 
                 # Get dynamic position size
                 position_size = self.strategy.get_position_size(symbol, self.position_size)
-                logger.info(f"   Position Size: ${position_size:.2f}")
+                logger.info("   Position Size: $%.2f", position_size)
                 
-                success = self.trader.buy_stock(symbol, position_size)
+                with self._order_lock:
+                    success = self.trader.buy_stock(symbol, position_size)
                 
                 if success:
-                    # Get actual shares and entry price from position
-                    position = self.trader.get_position(symbol)
-                    if position:
-                        # Calculate new shares added (Alpaca combines positions, so we need to track incrementally)
-                        existing_positions = self.strategy.position_tracker.get_all_positions_for_symbol(symbol)
-                        existing_total_shares = sum(p['shares'] for p in existing_positions)
-                        new_shares = position['shares'] - existing_total_shares
-                        
-                        if new_shares > 0:
-                            # Add new logical position with current entry price
-                            # Note: Alpaca averages entry prices, but we track each buy separately
-                            self.strategy.position_tracker.add_position(
-                                symbol,
-                                new_shares,
-                                position['avg_entry_price']  # Use Alpaca's averaged price for new shares
-                            )
-                            logger.info(f"✅ Successfully executed buy order for {symbol}")
-                            logger.info(f"   New Shares: {new_shares:.2f}, Entry: ${position['avg_entry_price']:.2f}")
-                            logger.info(f"   Total Shares: {position['shares']:.2f} ({len(existing_positions) + 1} positions)")
-                        else:
-                            logger.info(f"✅ Buy order executed for {symbol} (shares already tracked)")
-                    else:
-                        logger.warning(f"⚠️  Buy order executed but position not found")
+                    # Shares and entry price are reconciled from one positions snapshot after the loop
+                    bought_symbols.append(symbol)
                 else:
-                    logger.error(f"❌ Failed to execute buy order for {symbol}")
+                    logger.error("❌ Failed to execute buy order for %s", symbol)
             
             elif signal['action'] == 'SELL':
                 has_activity = True
-                logger.info("=" * 60)
-                logger.info(f"🕐 {datetime.now(self.timezone).strftime('%H:%M:%S')} - SELL SIGNAL detected")
-                logger.info("=" * 60)
-                logger.info(f"🔴 SELL SIGNAL detected for {symbol}")
-                logger.info(f"   Reason: {signal.get('reason', 'Anomaly detected')}")
+                logger.info(_SEP)
+                logger.info("🕐 %s - SELL SIGNAL detected", now_str)
+                logger.info(_SEP)
+                logger.info("🔴 SELL SIGNAL detected for %s", symbol)
+                logger.info("   Reason: %s", signal.get('reason', 'Anomaly detected'))
                 
-                # Get all positions for this symbol
-                all_positions = self.strategy.position_tracker.get_all_positions_for_symbol(symbol)
-                if all_positions:
-                    current_price = signal.get('current_price', 0)
-                    total_shares = sum(p['shares'] for p in all_positions)
+                with self._order_lock:
+                    # Get all positions for this symbol
+                    all_positions = self.strategy.position_tracker.get_all_positions_for_symbol(symbol)
+                    if all_positions:
+                        current_price = signal.get('current_price', 0)
                     
-                    logger.info(f"   Positions: {len(all_positions)}")
-                    for i, pos in enumerate(all_positions, 1):
-                        logger.info(f"   Position {i}: {pos['shares']:.2f} shares @ ${pos['entry_price']:.2f}")
-                    logger.info(f"   Current Price: ${current_price:.2f}")
+                        logger.info("   Positions: %d", len(all_positions))
+                        for i, pos in enumerate(all_positions, 1):
+                            logger.info("   Position %d: %.2f shares @ $%.2f", i, pos['shares'], pos['entry_price'])
+                        logger.info("   Current Price: $%.2f", current_price)
                     
-                    success = self.trader.sell_stock(symbol)
+                        success = self.trader.sell_stock(symbol)
                     
-                    if success:
-                        # Calculate profit for all positions (Alpaca sells everything)
-                        total_profit = 0
-                        for pos in all_positions:
-                            profit = (current_price - pos['entry_price']) * pos['shares']
-                            total_profit += profit
-                            self.strategy.update_performance(symbol, profit)
+                        if success:
+                            # Calculate profit for all positions (Alpaca sells everything)
+                            total_profit = self._record_profits(symbol, current_price, all_positions)
                         
-                        # Remove all positions (Alpaca sells everything)
-                        self.strategy.position_tracker.remove_position(symbol)
-                        logger.info(f"✅ Successfully executed sell order for {symbol}")
-                        logger.info(f"   Total Profit/Loss: ${total_profit:.2f} ({len(all_positions)} positions closed)")
+                            # Remove all positions (Alpaca sells everything)
+                            self.strategy.position_tracker.remove_position(symbol)
+                            logger.info("✅ Successfully executed sell order for %s", symbol)
+                            logger.info("   Total Profit/Loss: $%.2f (%d positions closed)", total_profit, len(all_positions))
+                        else:
+                            logger.error("❌ Failed to execute sell order for %s", symbol)
                     else:
-                        logger.error(f"❌ Failed to execute sell order for {symbol}")
-                else:
-                    logger.warning(f"⚠️  Sell signal but no position found for {symbol}")
+                        logger.warning("⚠️  Sell signal but no position found for %s", symbol)
             
             # Don't log HOLD signals to reduce verbosity (checking every minute)
         
+        if bought_symbols:
+            self._record_buys(bought_symbols)
+        
         # Only log completion if there was activity
         if has_activity:
-            logger.info("=" * 60)
+            logger.info(_SEP)
             logger.info("Trading logic execution complete.\n")
     
-    def _monitor_positions(self):
-        """Monitor existing positions for stop-loss and trailing stop triggers."""
-        all_positions_dict = self.strategy.position_tracker.get_all_positions()
+    def _record_buys(self, symbols: List[str]):
+        """Track newly bought shares using a single Alpaca positions snapshot."""
+        with self._order_lock:
+            positions_by_symbol = self.trader.get_all_positions()
+            
+            for symbol in symbols:
+                # Get actual shares and entry price from position
+                position = positions_by_symbol.get(symbol)
+                if not position:
+                    logger.warning("⚠️  Buy order executed for %s but position not found", symbol)
+                    continue
+                
+                # Calculate new shares added (Alpaca combines positions, so we need to track incrementally)
+                tracker = self.strategy.position_tracker
+                existing_count = tracker.position_count(symbol)
+                new_shares = position['shares'] - tracker.total_shares(symbol)
+                
+                if new_shares > 0:
+                    # Add new logical position with current entry price
+                    # Note: Alpaca averages entry prices, but we track each buy separately
+                    tracker.add_position(
+                        symbol,
+                        new_shares,
+                        position['avg_entry_price']  # Use Alpaca's averaged price for new shares
+                    )
+                    logger.info("✅ Successfully executed buy order for %s", symbol)
+                    logger.info("   New Shares: %.2f, Entry: $%.2f", new_shares, position['avg_entry_price'])
+                    logger.info("   Total Shares: %.2f (%d positions)", position['shares'], existing_count + 1)
+                else:
+                    logger.info("✅ Buy order executed for %s (shares already tracked)", symbol)
+    
+    def _record_profits(self, symbol: str, current_price: float, positions: List[Dict]) -> float:
+        """Record per-position profit for performance sizing and return the total P/L."""
+        entries = np.fromiter((p['entry_price'] for p in positions), dtype=np.float64, count=len(positions))
+        shares = np.fromiter((p['shares'] for p in positions), dtype=np.float64, count=len(positions))
+        profits = (current_price - entries) * shares
+        for profit in profits.tolist():
+            self.strategy.update_performance(symbol, profit)
+        return float(profits.sum())
+    
+    def _monitor_positions(self, quotes: Optional[Dict[str, Dict]] = None):
+        """
+        Monitor positions outside the watchlist for stop-loss and trailing stop triggers.
+        
+        Watchlist symbols are stop-checked by check_signals in _execute_trading_logic.
+        
+        Args:
+            quotes: Pre-fetched latest quotes (symbol -> quote); fetched here if None
+        """
+        watchlist = set(self._normalized_stocks)
+        tracker = self.strategy.position_tracker
+        # The other tick thread adds and removes positions under the order lock,
+        # so snapshot and update the tracker under it as well
+        with self._order_lock:
+            all_positions_dict = {
+                symbol: positions
+                for symbol, positions in tracker.get_all_positions().items()
+                if symbol not in watchlist
+            }
         
         if not all_positions_dict:
             return
         
         total_positions = sum(len(positions) for positions in all_positions_dict.values())
-        logger.info(f"\n🔍 Monitoring {total_positions} positions across {len(all_positions_dict)} symbols for stop-loss/trailing stop...")
+        logger.info("\n🔍 Monitoring %d positions across %d symbols for stop-loss/trailing stop...", total_positions, len(all_positions_dict))
+        
+        # Get current prices for all held symbols in one request
+        if quotes is None:
+            quotes = self.quote_provider.snapshot(list(all_positions_dict))
         
         for symbol, positions_list in all_positions_dict.items():
-            # Get current price
             try:
-                import yfinance as yf
-                ticker = yf.Ticker(symbol)
-                current_data = ticker.history(period='1d', interval='1m')
-                if not current_data.empty:
-                    current_price = float(current_data['Close'].iloc[-1])
+                quote = quotes.get(symbol)
+                if quote:
+                    current_price = quote['price']
                     
-                    # Log price check to Supabase
+                    with self._order_lock:
+                        # Price is inside every position's no-op band: nothing to update or log
+                        if not tracker.needs_update(symbol, current_price):
+                            continue
+                        
+                        # Check stop-loss and trailing stop
+                        should_sell, reason, position_to_sell = tracker.update_position(symbol, current_price)
+                    
+                    # Queue price check for Supabase (logged off the monitoring path)
                     try:
-                        from supabase_logger import log_price_check
-                        log_price_check(
+                        from supabase_logger import queue_price_check
+                        queue_price_check(
                             symbol=symbol,
                             price=current_price,
                             context='position_monitor',
-                            additional_data={'volume': float(current_data['Volume'].iloc[-1]) if 'Volume' in current_data.columns else None}
+                            additional_data={'volume': quote['volume']}
                         )
                     except Exception as e:
                         # Don't fail if Supabase logging fails
                         pass
                     
-                    # Check stop-loss and trailing stop
-                    should_sell, reason, position_to_sell = self.strategy.position_tracker.update_position(symbol, current_price)
-                    
                     if should_sell:
-                        # Get all positions for this symbol
-                        all_positions = self.strategy.position_tracker.get_all_positions_for_symbol(symbol)
-                        total_shares = sum(p['shares'] for p in all_positions)
+                        with self._order_lock:
+                            # Get all positions for this symbol
+                            all_positions = self.strategy.position_tracker.get_all_positions_for_symbol(symbol)
+                            if not all_positions:
+                                # Already closed by a sell signal in this cycle
+                                continue
+                            total_shares = self.strategy.position_tracker.total_shares(symbol)
                         
-                        logger.warning(f"⚠️  {reason} triggered for {symbol} at ${current_price:.2f}")
-                        if position_to_sell:
-                            logger.info(f"   Triggering Position: Entry ${position_to_sell['entry_price']:.2f}, Highest: ${position_to_sell['highest_price']:.2f}")
-                        logger.info(f"   Total Positions: {len(all_positions)}, Total Shares: {total_shares:.2f}")
+                            logger.warning("⚠️  %s triggered for %s at $%.2f", reason, symbol, current_price)
+                            if position_to_sell:
+                                logger.info("   Triggering Position: Entry $%.2f, Highest: $%.2f", position_to_sell['entry_price'], position_to_sell['highest_price'])
+                            logger.info("   Total Positions: %d, Total Shares: %.2f", self.strategy.position_tracker.position_count(symbol), total_shares)
                         
-                        success = self.trader.sell_stock(symbol)
+                            success = self.trader.sell_stock(symbol)
                         
-                        if success:
-                            # Calculate profit for all positions (Alpaca sells everything)
-                            total_profit = 0
-                            for pos in all_positions:
-                                profit = (current_price - pos['entry_price']) * pos['shares']
-                                total_profit += profit
-                                self.strategy.update_performance(symbol, profit)
+                            if success:
+                                # Calculate profit for all positions (Alpaca sells everything)
+                                total_profit = self._record_profits(symbol, current_price, all_positions)
                             
-                            # Remove all positions (Alpaca sells everything)
-                            self.strategy.position_tracker.remove_position(symbol)
-                            logger.info(f"✅ Position closed for {symbol}")
-                            logger.info(f"   Total Profit/Loss: ${total_profit:.2f} ({len(all_positions)} positions closed)")
-                        else:
-                            logger.error(f"❌ Failed to close position for {symbol}")
+                                # Remove all positions (Alpaca sells everything)
+                                self.strategy.position_tracker.remove_position(symbol)
+                                logger.info("✅ Position closed for %s", symbol)
+                                logger.info("   Total Profit/Loss: $%.2f (%d positions closed)", total_profit, len(all_positions))
+                            else:
+                                logger.error("❌ Failed to close position for %s", symbol)
             except Exception as e:
-                logger.error(f"Error monitoring position for {symbol}: {e}")
+                logger.error("Error monitoring position for %s: %s", symbol, e)
 
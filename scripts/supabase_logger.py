@@ -2,9 +2,13 @@
 Supabase logger for ticker price logging.
 Logs all ticker price checks to Supabase database.
 """
+import atexit
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -12,6 +16,24 @@ logger = logging.getLogger(__name__)
 # Supabase client (lazy initialization)
 _supabase_client = None
 
+# Background price-log queue, drained in batches by a daemon thread
+_LOG_BATCH_SIZE = 100
+_LOG_FLUSH_INTERVAL = 0.5  # seconds
+_log_queue: "queue.Queue[Dict]" = queue.Queue(maxsize=10_000)
+_log_worker: Optional[threading.Thread] = None
+_log_worker_lock = threading.Lock()  # also guards dropped_price_logs
+_log_stop = threading.Event()
+dropped_price_logs = 0
+
+# One pooled keep-alive HTTP client for all PostgREST requests, so repeated
+# inserts reuse connections instead of paying a TLS handshake each time
+_HTTP_MAX_KEEPALIVE = 20
+_HTTP_MAX_CONNECTIONS = 40
+_POSTGREST_TIMEOUT = 10  # seconds
+
+# Wait at exit for the batch the worker is inserting
+_LOG_EXIT_TIMEOUT = _POSTGREST_TIMEOUT + 2 * _LOG_FLUSH_INTERVAL  # seconds
+
 
 def get_supabase_client():
     """Get or create Supabase client."""
@@ -30,7 +52,11 @@ def get_supabase_client():
             logger.warning("Supabase credentials not configured. Price logging disabled.")
             return None
         
-        _supabase_client = create_client(supabase_url, supabase_key)
+        options = _client_options()
+        if options is not None:
+            _supabase_client = create_client(supabase_url, supabase_key, options=options)
+        else:
+            _supabase_client = create_client(supabase_url, supabase_key)
         logger.info("Supabase client initialized successfully")
         return _supabase_client
         
@@ -42,6 +68,59 @@ def get_supabase_client():
         return None
 
 
+def _client_options():
+    """
+    ClientOptions with a pooled httpx client. A supabase-py without the
+    httpx_client option gets just the PostgREST timeout, and None means
+    create_client's own defaults.
+    """
+    try:
+        import httpx
+        from supabase.lib.client_options import ClientOptions
+    except ImportError:
+        return None
+    
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_keepalive_connections=_HTTP_MAX_KEEPALIVE,
+            max_connections=_HTTP_MAX_CONNECTIONS
+        ),
+        timeout=_POSTGREST_TIMEOUT
+    )
+    try:
+        return ClientOptions(postgrest_client_timeout=_POSTGREST_TIMEOUT, httpx_client=http_client)
+    except TypeError:
+        # Older supabase-py has no httpx_client option; it still reuses its own client
+        http_client.close()
+        return ClientOptions(postgrest_client_timeout=_POSTGREST_TIMEOUT)
+
+
+def _build_price_row(
+    symbol: str,
+    price: float,
+    price_type: str,
+    source: str,
+    volume: Optional[float] = None,
+    timestamp: Optional[datetime] = None
+) -> Dict:
+    """Build a ticker_prices row."""
+    if timestamp is None:
+        timestamp = datetime.now()
+    
+    data = {
+        'symbol': symbol.upper(),
+        'price': float(price),
+        'price_type': price_type,
+        'source': source,
+        'timestamp': timestamp.isoformat(),
+    }
+    
+    if volume is not None:
+        data['volume'] = float(volume)
+    
+    return data
+
+
 def log_ticker_price(
     symbol: str,
     price: float,
@@ -53,6 +132,10 @@ def log_ticker_price(
     """
     Log ticker price to Supabase.
     
+    The row is queued and inserted by the background thread together with
+    other queued rows (one multi-row insert per batch), so this never waits
+    on the network.
+    
     Args:
         symbol: Stock symbol (e.g., 'AAPL')
         price: Current price
@@ -62,52 +145,45 @@ def log_ticker_price(
         timestamp: Timestamp (defaults to now)
         
     Returns:
-        True if logged successfully, False otherwise
+        True if queued, False if logging is disabled or the queue is full
     """
-    client = get_supabase_client()
-    
-    if client is None:
+    if get_supabase_client() is None:
         return False
     
-    try:
-        if timestamp is None:
-            timestamp = datetime.now()
-        
-        # Prepare data for insertion
-        data = {
-            'symbol': symbol.upper(),
-            'price': float(price),
-            'price_type': price_type,
-            'source': source,
-            'timestamp': timestamp.isoformat(),
-        }
-        
-        if volume is not None:
-            data['volume'] = float(volume)
-        
-        # Insert into Supabase
-        response = client.table('ticker_prices').insert(data).execute()
-        
-        if response.data:
-            logger.debug(f"✅ Logged {symbol} price ${price:.2f} to Supabase")
-            return True
-        else:
-            logger.warning(f"⚠️  Failed to log {symbol} price to Supabase: {response}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error logging ticker price to Supabase: {e}")
-        return False
+    return _enqueue_row(_build_price_row(symbol, price, price_type, source, volume, timestamp))
 
 
-def log_price_check(
+_PRICE_TYPE_MAP = {
+    'signal_check': 'close',
+    'position_monitor': 'intraday',
+    'buy': 'ask',
+    'sell': 'bid'
+}
+
+_SOURCE_MAP = {
+    'signal_check': 'yfinance',
+    'position_monitor': 'yfinance',
+    'buy': 'alpaca',
+    'sell': 'alpaca'
+}
+
+
+def _resolve_context(context: str, additional_data: Optional[Dict]):
+    """Map a check context to (price_type, source, volume)."""
+    price_type = _PRICE_TYPE_MAP.get(context, 'close')
+    source = _SOURCE_MAP.get(context, 'yfinance')
+    volume = (additional_data or {}).get('volume')
+    return price_type, source, volume
+
+
+def queue_price_check(
     symbol: str,
     price: float,
     context: str = 'signal_check',
     additional_data: Optional[Dict] = None
 ) -> bool:
     """
-    Log a price check with context.
+    Queue a price check with context for background logging (non-blocking).
     
     Args:
         symbol: Stock symbol
@@ -116,30 +192,9 @@ def log_price_check(
         additional_data: Additional data to log (optional)
         
     Returns:
-        True if logged successfully
+        True if queued, False if logging is disabled or the queue is full
     """
-    price_type_map = {
-        'signal_check': 'close',
-        'position_monitor': 'intraday',
-        'buy': 'ask',
-        'sell': 'bid'
-    }
-    
-    source_map = {
-        'signal_check': 'yfinance',
-        'position_monitor': 'yfinance',
-        'buy': 'alpaca',
-        'sell': 'alpaca'
-    }
-    
-    price_type = price_type_map.get(context, 'close')
-    source = source_map.get(context, 'yfinance')
-    
-    data = additional_data or {}
-    if 'volume' in data:
-        volume = data['volume']
-    else:
-        volume = None
+    price_type, source, volume = _resolve_context(context, additional_data)
     
     return log_ticker_price(
         symbol=symbol,
@@ -149,3 +204,91 @@ def log_price_check(
         volume=volume
     )
 
+
+# Older name; price checks are always queued now
+log_price_check = queue_price_check
+
+
+def _enqueue_row(row: Dict) -> bool:
+    """Hand a row to the background thread; counts it as dropped if the queue is full."""
+    global dropped_price_logs
+    
+    _ensure_log_worker()
+    try:
+        _log_queue.put_nowait(row)
+        return True
+    except queue.Full:
+        with _log_worker_lock:
+            dropped_price_logs += 1
+        return False
+
+
+def _ensure_log_worker():
+    """Start the background drain thread once (stopped and flushed at exit)."""
+    global _log_worker
+    
+    if _log_worker is not None:
+        return
+    
+    with _log_worker_lock:
+        if _log_worker is None:
+            _log_worker = threading.Thread(target=_drain_log_queue, name='supabase-log', daemon=True)
+            _log_worker.start()
+            atexit.register(_stop_log_worker)
+
+
+def _insert_batch(client, batch: List[Dict]) -> bool:
+    try:
+        client.table('ticker_prices').insert(batch).execute()
+        logger.debug(f"✅ Logged {len(batch)} prices to Supabase")
+        return True
+    except Exception as e:
+        logger.error(f"Error logging {len(batch)} ticker prices to Supabase: {e}")
+        return False
+
+
+def _drain_log_queue():
+    """Insert queued rows in batches of up to _LOG_BATCH_SIZE every _LOG_FLUSH_INTERVAL until stopped."""
+    while not _log_stop.is_set():
+        try:
+            batch: List[Dict] = [_log_queue.get(timeout=_LOG_FLUSH_INTERVAL)]
+        except queue.Empty:
+            continue
+        deadline = time.monotonic() + _LOG_FLUSH_INTERVAL
+        while len(batch) < _LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        client = get_supabase_client()
+        if client is not None:
+            _insert_batch(client, batch)
+
+
+def _stop_log_worker():
+    """At exit: let the worker finish the batch it holds, then insert what is still queued."""
+    _log_stop.set()
+    if _log_worker is not None:
+        _log_worker.join(timeout=_LOG_EXIT_TIMEOUT)
+    _flush_log_queue()
+
+
+def _flush_log_queue():
+    """Insert whatever is still queued, in batches of up to _LOG_BATCH_SIZE."""
+    client = get_supabase_client()
+    if client is None:
+        return
+    
+    while True:
+        batch: List[Dict] = []
+        while len(batch) < _LOG_BATCH_SIZE:
+            try:
+                batch.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch or not _insert_batch(client, batch):
+            return
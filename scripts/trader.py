@@ -125,8 +125,8 @@ class Trader:
             
             # Log price check to Supabase
             try:
-                from supabase_logger import log_price_check
-                log_price_check(
+                from supabase_logger import queue_price_check
+                queue_price_check(
                     symbol=symbol,
                     price=current_price,
                     context='buy',
@@ -247,8 +247,8 @@ class Trader:
             
             # Log price check to Supabase
             try:
-                from supabase_logger import log_price_check
-                log_price_check(
+                from supabase_logger import queue_price_check
+                queue_price_check(
                     symbol=symbol,
                     price=current_price,
                     context='sell',
@@ -306,14 +306,29 @@ class Trader:
                 positions = self.client.get_all_positions()
                 position = next((p for p in positions if p.symbol == symbol), None)
                 if position:
-                    return {
-                        'symbol': position.symbol,
-                        'shares': float(position.qty),
-                        'avg_entry_price': float(position.avg_entry_price),
-                        'market_value': float(position.market_value)
-                    }
+                    return self._position_to_dict(position)
             return None
         except Exception as e:
             logger.error(f"Error getting position for {symbol}: {e}")
             return None
+    
+    def get_all_positions(self) -> Dict[str, Dict]:
+        """Get all current positions keyed by symbol (one API call)."""
+        try:
+            if self.client:
+                return {p.symbol: self._position_to_dict(p) for p in self.client.get_all_positions()}
+            return {}
+        except Exception as e:
+            logger.error(f"Error getting positions: {e}")
+            return {}
+    
+    @staticmethod
+    def _position_to_dict(position) -> Dict:
+        """Convert an Alpaca position to a plain dict."""
+        return {
+            'symbol': position.symbol,
+            'shares': float(position.qty),
+            'avg_entry_price': float(position.avg_entry_price),
+            'market_value': float(position.market_value)
+        }
 
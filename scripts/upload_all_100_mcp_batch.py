@@ -1,98 +1,24 @@
 """
 Upload all 100 stocks (2 years) to Supabase using MCP execute_sql.
 Processes data in batches of 500 rows and executes SQL INSERT statements.
+With a Postgres URL configured, rows are loaded with COPY instead, through an
+asyncpg pool when installed and psycopg2 as the fallback.
 """
-import pandas as pd
 import sys
 import os
+from upload_stocks import upload_stocks
 
-def upload_via_mcp_batches(csv_file: str, batch_size: int = 500):
+
+def upload_via_mcp_batches(csv_file: str, batch_size: int = 500, transport: str = 'copy'):
     """Upload CSV to Supabase via MCP execute_sql in batches."""
-    print("=" * 80)
-    print("UPLOADING TO SUPABASE VIA MCP")
-    print("=" * 80)
-    print(f"File: {csv_file}")
-    print(f"Table: stock_ohlc_30min")
-    print(f"Batch Size: {batch_size} rows per SQL statement")
-    print()
-    
-    # Read CSV
-    print("📖 Reading CSV...")
-    df = pd.read_csv(csv_file)
-    print(f"✅ Loaded {len(df):,} rows")
-    
-    df['Datetime'] = pd.to_datetime(df['Datetime'])
-    
-    total_batches = (len(df) + batch_size - 1) // batch_size
-    print(f"📤 Will execute {total_batches} SQL batches")
-    print(f"   Estimated time: {total_batches * 3 / 60:.1f} minutes")
-    print()
-    print("🚀 Starting upload...")
-    print()
-    
-    successful = 0
-    failed = 0
-    
-    for i in range(0, len(df), batch_size):
-        batch_num = (i // batch_size) + 1
-        batch_df = df.iloc[i:i + batch_size]
-        
-        # Generate SQL INSERT statement
-        values_list = []
-        for _, row in batch_df.iterrows():
-            symbol = str(row['Symbol']).upper().replace("'", "''")
-            datetime_val = pd.to_datetime(row['Datetime']).isoformat()
-            date_val = str(row['Date'])
-            time_val = str(row['Time'])
-            
-            trade_count_val = int(row['trade_count']) if 'trade_count' in row and pd.notna(row.get('trade_count')) else None
-            vwap_val = float(row['vwap']) if 'vwap' in row and pd.notna(row.get('vwap')) else None
-            
-            trade_count_sql = str(trade_count_val) if trade_count_val is not None else 'NULL'
-            vwap_sql = str(vwap_val) if vwap_val is not None else 'NULL'
-            
-            values_list.append(
-                f"('{symbol}', '{datetime_val}'::timestamptz, '{date_val}'::date, "
-                f"'{time_val}'::time, {float(row['Open'])}, {float(row['High'])}, "
-                f"{float(row['Low'])}, {float(row['Close'])}, {int(row['Volume'])}, "
-                f"{trade_count_sql}, {vwap_sql})"
-            )
-        
-        sql = f"""
-INSERT INTO stock_ohlc_30min (symbol, datetime, date, time, open, high, low, close, volume, trade_count, vwap)
-VALUES {', '.join(values_list)}
-ON CONFLICT (symbol, datetime) DO NOTHING;
-"""
-        
-        # Execute via MCP Supabase execute_sql
-        try:
-            # This will be executed via MCP tool
-            print(f"📤 Batch {batch_num}/{total_batches}: Uploading {len(batch_df)} rows...", end=' ', flush=True)
-            
-            # The actual MCP call would happen here
-            # For now, we'll need to execute this via MCP tools
-            
-            successful += len(batch_df)
-            print(f"✅ ({successful:,}/{len(df):,} total)")
-            
-        except Exception as e:
-            failed += len(batch_df)
-            error_msg = str(e)
-            print(f"❌ {error_msg[:80]}")
-    
-    print()
-    print("=" * 80)
-    print("SUMMARY")
-    print("=" * 80)
-    print(f"✅ Successful: {successful:,} records")
-    print(f"❌ Failed: {failed:,} records")
-    print(f"📊 Total: {len(df):,} records")
-    
-    return successful > 0
+    return upload_stocks(csv_file, batch_size=batch_size, transport=transport)
 
 
 if __name__ == '__main__':
-    csv_file = sys.argv[1] if len(sys.argv) > 1 else 'all_100_stocks_30min_2years_alpaca_20251116.csv'
+    # --insert: parameterized psycopg2 INSERTs instead of COPY
+    transport = 'insert' if '--insert' in sys.argv[1:] else 'copy'
+    args = [arg for arg in sys.argv[1:] if arg != '--insert']
+    csv_file = args[0] if args else 'all_100_stocks_30min_2years_alpaca_20251116.csv'
     
     if not os.path.exists(csv_file):
         print(f"❌ File not found: {csv_file}")
@@ -102,11 +28,10 @@ if __name__ == '__main__':
     # For now, we'll use a different approach - upload via Python client
     # after setting up credentials, or use MCP tools directly
     
-    print("⚠️  This script generates SQL for MCP execution.")
+    print("⚠️  Without asyncpg/psycopg2 and a Postgres URL, this script generates SQL for MCP execution.")
     print("   For direct upload, configure SUPABASE_URL and SUPABASE_KEY")
     print("   in .env and use: upload_all_100_to_supabase.py")
     print()
     
     # Actually try to upload using MCP
-    upload_via_mcp_batches(csv_file)
-
+    upload_via_mcp_batches(csv_file, transport=transport)
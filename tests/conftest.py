@@ -0,0 +1,7 @@
+"""Shared test setup."""
+
+import sys
+from pathlib import Path
+
+# The scripts/ modules import each other by bare name (from bar_pipeline import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
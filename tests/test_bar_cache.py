@@ -0,0 +1,68 @@
+"""Tests for the SQLite bar cache used by the Yahoo 30-minute scripts."""
+
+import pandas as pd
+
+from bar_cache import cached_history
+
+
+class FakeTicker:
+    """yf.Ticker stand-in serving hourly bars; the first `failures` calls come back empty."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def history(self, start, end, interval):
+        self.calls.append((start, end))
+        if len(self.calls) <= self.failures:
+            return pd.DataFrame()  # yfinance's response to a rate limit or error
+        index = pd.date_range(start.ceil("h"), end, freq="h", inclusive="left", name="Datetime")
+        return pd.DataFrame(
+            {"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100},
+            index=index,
+        )
+
+
+def test_empty_response_is_not_cached_as_fetched(tmp_path):
+    """A window that came back empty is requested again on the next run."""
+    db_path = str(tmp_path / "bars.db")
+    end = pd.Timestamp.now(tz="UTC").floor("h")
+    start = end - pd.Timedelta(days=2)
+    ticker = FakeTicker(failures=1)
+
+    first = cached_history(ticker, "AAPL", "30m", start, end, db_path=db_path)
+    assert first.empty
+
+    second = cached_history(ticker, "AAPL", "30m", start, end, db_path=db_path)
+    assert len(second) == 48
+    assert len(ticker.calls) == 2
+
+
+def test_cached_range_is_not_refetched(tmp_path):
+    """A second run over the same range is served from the cache."""
+    db_path = str(tmp_path / "bars.db")
+    end = pd.Timestamp.now(tz="UTC").floor("h")
+    start = end - pd.Timedelta(days=2)
+    ticker = FakeTicker()
+
+    cached_history(ticker, "AAPL", "30m", start, end, db_path=db_path)
+    bars = cached_history(ticker, "AAPL", "30m", start, end, db_path=db_path)
+
+    assert len(bars) == 48
+    assert len(ticker.calls) == 1
+
+
+def test_intraday_request_clipped_to_yahoo_history(tmp_path):
+    """30-minute bars older than 60 days are never requested from Yahoo."""
+    db_path = str(tmp_path / "bars.db")
+    end = pd.Timestamp.now(tz="UTC").floor("h")
+    ticker = FakeTicker()
+
+    bars = cached_history(ticker, "AAPL", "30m", end - pd.Timedelta(days=365), end - pd.Timedelta(days=61),
+                          db_path=db_path)
+    assert bars.empty
+    assert ticker.calls == []
+
+    cached_history(ticker, "AAPL", "30m", end - pd.Timedelta(days=90), end, db_path=db_path)
+    oldest_start = min(start for start, _ in ticker.calls)
+    assert oldest_start >= pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=60, minutes=1)
@@ -0,0 +1,83 @@
+"""Tests for the shared ET wall-clock and market-hours helpers in bar_pipeline."""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from bar_pipeline import NS_PER_MINUTE, market_hours_mask, to_et, wall_clock_ns, write_csv_table
+
+
+def _bars_across_dst():
+    """30-minute UTC timestamps spanning the 2023-2025 spring/fall DST transitions."""
+    return pd.Series(pd.date_range("2023-01-01", "2025-12-31", freq="30min", tz="UTC"))
+
+
+def _expected_wall_clock_ns(datetimes):
+    """ET wall clock as naive nanoseconds, computed by pandas."""
+    return to_et(datetimes).dt.tz_localize(None).astype("datetime64[ns]").to_numpy().astype("int64")
+
+
+def test_wall_clock_matches_pandas_across_dst():
+    """The offsets from the pytz transition table agree with pandas' tz conversion."""
+    datetimes = _bars_across_dst()
+    et = to_et(datetimes)
+
+    np.testing.assert_array_equal(wall_clock_ns(et), _expected_wall_clock_ns(datetimes))
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_wall_clock_non_ns_units(unit):
+    """Values stored in coarser units are scaled to nanoseconds."""
+    datetimes = _bars_across_dst().dt.as_unit(unit)
+
+    np.testing.assert_array_equal(wall_clock_ns(to_et(datetimes)), _expected_wall_clock_ns(datetimes))
+
+
+def test_wall_clock_nat():
+    """NaT rows come back as the NaT sentinel; the other rows are unaffected."""
+    datetimes = pd.Series(pd.to_datetime(["2024-03-10 06:30", None, "2024-11-03 14:00"], utc=True))
+    result = wall_clock_ns(to_et(datetimes))
+
+    assert result[1] == np.iinfo("int64").min
+    valid = datetimes.notna().to_numpy()
+    np.testing.assert_array_equal(result[valid], _expected_wall_clock_ns(datetimes[valid]))
+
+
+def test_wall_clock_naive_passthrough():
+    """Naive datetimes are returned as their own nanosecond values."""
+    datetimes = pd.Series(pd.date_range("2024-01-02 09:30", periods=3, freq="30min"))
+
+    np.testing.assert_array_equal(wall_clock_ns(datetimes), datetimes.astype("datetime64[ns]").astype("int64").to_numpy())
+
+
+def test_market_hours_mask_matches_between_time():
+    """9:30 AM - 4:00 PM ET inclusive, same as DatetimeIndex.indexer_between_time."""
+    et = to_et(_bars_across_dst())
+    expected = np.zeros(len(et), dtype=bool)
+    expected[pd.DatetimeIndex(et).indexer_between_time("09:30", "16:00")] = True
+
+    np.testing.assert_array_equal(market_hours_mask(wall_clock_ns(et)), expected)
+
+
+def test_market_hours_mask_bounds():
+    """The open and close minutes are included, the minutes outside are not."""
+    minutes = np.array([9 * 60 + 29, 9 * 60 + 30, 16 * 60, 16 * 60 + 1]) * NS_PER_MINUTE
+
+    assert market_hours_mask(minutes).tolist() == [False, True, True, False]
+
+
+def test_write_csv_table_unquoted(tmp_path):
+    """Header and strings are written unquoted, like to_csv."""
+    path = tmp_path / "bars.csv"
+    write_csv_table(pa.table({"Symbol": ["AAPL", "BRK.B"], "Close": [190.25, 71226.0]}), str(path))
+
+    assert path.read_text() == "Symbol,Close\nAAPL,190.25\nBRK.B,71226\n"
+
+
+def test_write_csv_table_quotes_when_needed(tmp_path):
+    """A string with a comma falls back to quoted strings instead of breaking the row."""
+    path = tmp_path / "bars.csv"
+    write_csv_table(pa.table({"Name": ["Apple, Inc."], "Close": [190.25]}), str(path))
+
+    assert pd.read_csv(path).to_dict("list") == {"Name": ["Apple, Inc."], "Close": [190.25]}
@@ -0,0 +1,41 @@
+"""Tests for combining the per-batch 2-year CSV files."""
+
+import pandas as pd
+import pyarrow as pa
+
+from bar_pipeline import write_csv_table
+from combine_all_100_stocks_2years import combine_all_2year_data
+
+
+def _batch(symbol):
+    return pd.DataFrame({
+        "Datetime": ["2024-03-01 09:30:00-05:00", "2024-03-01 10:00:00-05:00"],
+        "Open": [71226.0, 71230.5],
+        "High": [71240.0, 71250.0],
+        "Low": [71200.0, 71220.0],
+        "Close": [71230.0, 71245.0],
+        "Volume": [1000.0, 2500.0],
+        "trade_count": [12.0, 30.0],
+        "vwap": [71228.0, 71236.25],
+        "Date": ["2024-03-01", "2024-03-01"],
+        "Time": ["09:30:00", "10:00:00"],
+        "Symbol": [symbol, symbol],
+    })
+
+
+def test_combine_to_csv_and_arrow_written_files(tmp_path, monkeypatch):
+    """A to_csv file (71226.0) and a write_csv_table file (71226) combine into float columns."""
+    monkeypatch.chdir(tmp_path)
+    _batch("AAPL").to_csv("first10_top50_30min_2years_alpaca_20240301.csv", index=False)
+    write_csv_table(
+        pa.Table.from_pandas(_batch("MSFT"), preserve_index=False),
+        "last20_top50_30min_2years_alpaca_20240301.csv"
+    )
+
+    combined = combine_all_2year_data()
+
+    assert len(combined) == 4
+    assert combined["Symbol"].astype(str).tolist() == ["AAPL", "AAPL", "MSFT", "MSFT"]
+    for col in ("Open", "Volume", "trade_count"):
+        assert combined[col].dtype == "float64"
+    assert combined["Open"].tolist() == [71226.0, 71230.5] * 2
@@ -0,0 +1,54 @@
+"""Tests for the batched quote providers used by the live scheduler."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from quote_provider import PolygonQuoteProvider, QuoteProvider, YFinanceQuoteProvider, get_quote_provider
+
+
+def test_provider_without_snapshot_fails_at_construction():
+    """A QuoteProvider subclass must implement snapshot."""
+    class Incomplete(QuoteProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_polygon_snapshot_price_fallbacks():
+    """Last trade first, then the minute bar, then the day bar; symbols without a price are skipped."""
+    provider = PolygonQuoteProvider(api_key="key")
+    response = Mock()
+    response.json.return_value = {"tickers": [
+        {"ticker": "AAPL", "lastTrade": {"p": 190.5}, "min": {"c": 190.0, "v": 1200}},
+        {"ticker": "MSFT", "min": {"c": 410.25, "v": 800}},
+        {"ticker": "NVDA", "day": {"c": 120.0}},
+        {"ticker": "NONE"},
+    ]}
+    provider.session = Mock()
+    provider.session.get.return_value = response
+
+    quotes = provider.snapshot(["AAPL", "MSFT", "NVDA", "NONE"])
+
+    assert quotes == {
+        "AAPL": {"price": 190.5, "volume": 1200.0},
+        "MSFT": {"price": 410.25, "volume": 800.0},
+        "NVDA": {"price": 120.0, "volume": None},
+    }
+    assert provider.session.get.call_args.kwargs["params"]["tickers"] == "AAPL,MSFT,NVDA,NONE"
+
+
+def test_polygon_snapshot_error_returns_empty():
+    """HTTP errors are logged and give no quotes."""
+    provider = PolygonQuoteProvider(api_key="key")
+    provider.session = Mock()
+    provider.session.get.side_effect = ConnectionError("down")
+
+    assert provider.snapshot(["AAPL"]) == {}
+
+
+def test_get_quote_provider_selection():
+    """Polygon with an API key, yfinance without one."""
+    assert isinstance(get_quote_provider(api_key="key"), PolygonQuoteProvider)
+    assert isinstance(get_quote_provider(api_key=""), YFinanceQuoteProvider)
@@ -0,0 +1,61 @@
+"""Tests for the row builders of the combined-CSV upload (SQL text and psycopg2 parameters)."""
+
+import math
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from pg_copy import _insert_rows
+from upload_stocks import sql_values
+
+
+def _combined_rows():
+    """Two rows shaped like the combined CSV once read by upload_stocks (NaN trade_count/vwap in one)."""
+    return pd.DataFrame({
+        "Datetime": pd.to_datetime(["2024-03-01 14:30:00+00:00", "2024-03-01 15:00:00+00:00"], utc=True),
+        "Open": [189.5, 190.0],
+        "High": [190.25, 190.5],
+        "Low": [189.0, 189.75],
+        "Close": [190.0, 190.25],
+        "Volume": [1000.0, 2500.0],
+        "trade_count": [12.0, float("nan")],
+        "vwap": [189.9, float("nan")],
+        "Date": ["2024-03-01", "2024-03-01"],
+        "Time": ["09:30:00", "10:00:00"],
+        "Symbol": ["brk.b", "O'X"],
+    })
+
+
+def test_sql_values_formats_rows():
+    """One VALUES tuple per row: upper-cased, quote-escaped symbol, casts, NULL for NaN."""
+    rows = _combined_rows()
+    rows["Datetime"] = rows["Datetime"].dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+    assert sql_values(rows) == [
+        "('BRK.B', '2024-03-01T14:30:00+00:00'::timestamptz, '2024-03-01'::date, '09:30:00'::time, "
+        "189.5, 190.25, 189.0, 190.0, 1000, 12, 189.9)",
+        "('O''X', '2024-03-01T15:00:00+00:00'::timestamptz, '2024-03-01'::date, '10:00:00'::time, "
+        "190.0, 190.5, 189.75, 190.25, 2500, NULL, NULL)",
+    ]
+
+
+def test_sql_values_without_optional_columns():
+    """Frames without trade_count/vwap insert NULL for them."""
+    rows = _combined_rows().drop(columns=["trade_count", "vwap"])
+    rows["Datetime"] = rows["Datetime"].dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+    assert all(value.endswith(", NULL, NULL)") for value in sql_values(rows))
+
+
+def test_insert_rows_parameters():
+    """Parameter tuples in INSERT_VALUES_SQL column order, native types, None for NaN."""
+    first, second = _insert_rows(_combined_rows())
+
+    assert first == (
+        "BRK.B", datetime(2024, 3, 1, 14, 30, tzinfo=timezone.utc), "2024-03-01", "09:30:00",
+        189.5, 190.25, 189.0, 190.0, 1000, 12, 189.9,
+    )
+    assert second[0] == "O'X"
+    assert second[-2:] == (None, None)
+    assert all(type(value) is int for value in (first[8], first[9], second[8]))
+    assert not any(isinstance(value, float) and math.isnan(value) for value in second)